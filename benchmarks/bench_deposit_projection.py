@@ -0,0 +1,79 @@
+"""Benchmark deposit queries with and without an IncludeRetElement projection.
+
+QuickBooks is replaced by :class:`benchmarks.fake_qb.FakeQuickBooks`, which
+returns full ``DepositRet`` elements unless the query names the elements it
+wants. Run from the repository root:
+
+    python -m benchmarks.bench_deposit_projection --deposits 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.fake_qb import FakeQuickBooks, make_deposits
+from src import qb_reader
+from src.models import QBDeposit
+from src.qbxml import build_deposit_query, ref_element
+
+
+def _parse(raw: str) -> list[QBDeposit]:
+    return list(qb_reader._iter_qb_deposits(raw))
+
+
+def _measure(raw: str, repeat: int) -> tuple[float, int, list[QBDeposit]]:
+    best = float("inf")
+    deposits: list[QBDeposit] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        deposits = _parse(raw)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    _parse(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, deposits
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--deposits", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    accounts = {"Chase": "80000001-1700000000"}
+    fake = FakeQuickBooks(make_deposits(args.deposits))
+    full_raw = fake.ProcessRequest(
+        "ticket", build_deposit_query(ref_element("Chase", accounts))
+    )
+    trimmed_raw = fake.ProcessRequest(
+        "ticket", qb_reader._deposit_query("Chase", accounts)
+    )
+
+    full_time, full_peak, full = _measure(full_raw, args.repeat)
+    trimmed_time, trimmed_peak, trimmed = _measure(trimmed_raw, args.repeat)
+    if full != trimmed:
+        raise SystemExit("projection changed the parsed deposits")
+
+    full_bytes = len(full_raw.encode("utf-8"))
+    trimmed_bytes = len(trimmed_raw.encode("utf-8"))
+    print(f"deposits: {args.deposits}")
+    print(
+        f"full:    {full_bytes / 1e6:.1f} MB, parse {full_time:.3f}s, "
+        f"peak {full_peak / 1e6:.1f} MB"
+    )
+    print(
+        f"trimmed: {trimmed_bytes / 1e6:.1f} MB, parse {trimmed_time:.3f}s, "
+        f"peak {trimmed_peak / 1e6:.1f} MB"
+    )
+    print(
+        f"bytes: {full_bytes / trimmed_bytes:.2f}x smaller, "
+        f"parse: {full_time / trimmed_time:.2f}x faster"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,118 @@
+"""Benchmark the shared QBXML builder against the original f-string builder.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_qbxml_builder --rows 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from typing import Callable, List
+
+from src.models import MiscIncome
+from src.qbxml import build_deposit_add_batch
+
+
+def _legacy_escape_xml(value: str) -> str:
+    return (
+        value.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace('"', "&quot;")
+        .replace("'", "&apos;")
+    )
+
+
+def legacy_build(incomes: List[MiscIncome], bank_account: str) -> str:
+    """Reproduction of the per-row f-string builder formerly in qb_adder."""
+
+    requests = []
+    for income in incomes:
+        miscAmount = float(income.amount)
+        requests.append(
+            f"    <DepositAddRq>\n"
+            f"      <DepositAdd>\n"
+            f"        <DepositToAccountRef>\n"
+            f"          <FullName>{_legacy_escape_xml(str(bank_account))}</FullName>\n"
+            f"        </DepositToAccountRef>\n"
+            f"        <DepositLineAdd>\n"
+            f"          <AccountRef>\n"
+            f"            <FullName>{_legacy_escape_xml(str(income.chart_of_account))}</FullName>\n"
+            f"          </AccountRef>\n"
+            f"          <Memo>{_legacy_escape_xml(str(income.record_id))}</Memo>\n"
+            f"          <Amount>{miscAmount:.2f}</Amount>\n"
+            f"        </DepositLineAdd>\n"
+            f"      </DepositAdd>\n"
+            f"    </DepositAddRq>"
+        )
+    return (
+        '<?xml version="1.0"?>\n'
+        '<?qbxml version="13.0"?>\n'
+        "<QBXML>\n"
+        '  <QBXMLMsgsRq onError="continueOnError">\n' + "\n".join(requests) + "\n"
+        "  </QBXMLMsgsRq>\n"
+        "</QBXML>"
+    )
+
+
+def _sample_incomes(rows: int) -> List[MiscIncome]:
+    accounts = ["Rental", "Taxes-Property", "Misc Credits", "R&D <Grants>"]
+    return [
+        MiscIncome(
+            record_id=str(7000 + i),
+            amount=(i % 5000) + 0.25,
+            chart_of_account=accounts[i % len(accounts)],
+            source="excel",
+        )
+        for i in range(rows)
+    ]
+
+
+def _measure(
+    build: Callable[[List[MiscIncome], str], str],
+    incomes: List[MiscIncome],
+    bank_account: str,
+    repeat: int,
+) -> tuple[float, int, str]:
+    best = float("inf")
+    output = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = build(incomes, bank_account)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    build(incomes, bank_account)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, output
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--bank_account", default="Chase & Co")
+    args = parser.parse_args(argv)
+
+    incomes = _sample_incomes(args.rows)
+    legacy_time, legacy_peak, legacy_xml = _measure(
+        legacy_build, incomes, args.bank_account, args.repeat
+    )
+    new_time, new_peak, new_xml = _measure(
+        build_deposit_add_batch, incomes, args.bank_account, args.repeat
+    )
+    if legacy_xml != new_xml:
+        raise SystemExit("builders disagree: output is not byte-identical")
+
+    print(f"rows: {args.rows}")
+    print(f"legacy: {legacy_time:.3f}s, peak {legacy_peak / 1e6:.1f} MB")
+    print(f"shared: {new_time:.3f}s, peak {new_peak / 1e6:.1f} MB")
+    print(f"speedup: {legacy_time / new_time:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,210 @@
+"""Per-stage throughput and memory of a sync at increasing sizes.
+
+Synthetic workbooks and QuickBooks responses from :mod:`benchmarks.synthetic`
+are pushed through each stage of a sync: reading the workbook, validating
+it, parsing the deposit response, comparing, building the QBXML for the
+adds, and writing the report. Every stage is timed, then run again under
+tracemalloc for its peak memory. Results are compared with a stored
+baseline, and stages that got slower or larger than ``--tolerance`` are
+flagged (exit status 1). Run from the repository root:
+
+    python -m benchmarks.bench_scaling --sizes 1000,10000,100000
+    python -m benchmarks.bench_scaling --sizes 1000,10000 --save_baseline
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.synthetic import ACCOUNTS, generate, qb_response, write_workbook
+from src.comparer import compare_excel_qb
+from src.excel_reader import extract_deposits
+from src.qb_reader import _iter_deposits
+from src.qbxml import iter_deposit_add_batches
+from src.qb_adder import DEFAULT_CHUNK_SIZE
+from src.reporting import iso_timestamp, write_report
+from src.runner import _conflict_to_dict, _missing_in_excel_conflict
+from src.validation import validate_deposits
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline_scaling.json")
+DEFAULT_SIZES = "1000,10000,100000"
+DEFAULT_TOLERANCE = 0.25
+MIN_TIMED_SECONDS = 0.05
+
+
+def _stages(workbook: Path, response: str, report: Path) -> List[tuple[str, Callable]]:
+    """Return ``(name, stage)`` pairs; each stage feeds the next via ``state``."""
+
+    state: Dict[str, Any] = {}
+    known_accounts = {name: number for number, name, _ in ACCOUNTS}
+
+    def extract() -> int:
+        state["excel"] = extract_deposits(workbook)
+        return len(state["excel"])
+
+    def validate() -> int:
+        state["valid"] = validate_deposits(state["excel"], known_accounts).valid
+        return len(state["excel"])
+
+    def parse_qb() -> int:
+        state["qb"] = [line for _, line in _iter_deposits(response)]
+        return len(state["qb"])
+
+    def compare() -> int:
+        state["report"] = compare_excel_qb(state["valid"], state["qb"])
+        return len(state["valid"]) + len(state["qb"])
+
+    def build_qbxml() -> int:
+        adds = state["report"].excel_only
+        for _ in iter_deposit_add_batches(adds, "Chase", DEFAULT_CHUNK_SIZE):
+            pass
+        return len(adds)
+
+    def report_json() -> int:
+        comparison = state["report"]
+        conflicts = [_conflict_to_dict(c) for c in comparison.conflicts]
+        conflicts.extend(_missing_in_excel_conflict(t) for t in comparison.qb_only)
+        write_report(
+            {
+                "status": "success",
+                "generated_at": iso_timestamp(),
+                "added_misc_income": [
+                    {"record_id": i.record_id, "amount": i.amount}
+                    for i in comparison.excel_only
+                ],
+                "conflicts": conflicts,
+                "same_misc_income": comparison.match_count,
+                "rejected_rows": [],
+                "error": None,
+            },
+            report,
+        )
+        return len(conflicts) + len(comparison.excel_only)
+
+    return [
+        ("extract_deposits", extract),
+        ("validate_deposits", validate),
+        ("parse_qb_deposits", parse_qb),
+        ("compare_excel_qb", compare),
+        ("build_add_qbxml", build_qbxml),
+        ("write_report", report_json),
+    ]
+
+
+def measure(
+    size: int, directory: Path, *, seed: int = 0
+) -> Dict[str, Dict[str, float]]:
+    """Return ``{stage: {rows, seconds, rows_per_second, peak_mb}}`` for ``size``."""
+
+    data = generate(size, seed=seed)
+    workbook = write_workbook(directory / f"synthetic_{size}.xlsx", data.excel_rows)
+    response = qb_response(data.qb_deposits)
+    results: Dict[str, Dict[str, float]] = {}
+    for name, stage in _stages(workbook, response, directory / "report.json"):
+        start = time.perf_counter()
+        rows = stage()
+        seconds = time.perf_counter() - start
+        results[name] = {
+            "rows": rows,
+            "seconds": round(seconds, 4),
+            "rows_per_second": round(rows / seconds if seconds else 0.0, 1),
+        }
+    # Peaks are taken on a second pass, since tracing slows every allocation
+    for name, stage in _stages(workbook, response, directory / "report.json"):
+        tracemalloc.start()
+        try:
+            stage()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        results[name]["peak_mb"] = round(peak / 1e6, 2)
+    return results
+
+
+def regressions(
+    current: Dict[str, Dict[str, Dict[str, float]]],
+    baseline: Dict[str, Dict[str, Dict[str, float]]],
+    tolerance: float,
+) -> List[str]:
+    """Describe every stage slower or larger than the baseline by ``tolerance``."""
+
+    found: List[str] = []
+    for size, stages in current.items():
+        for name, result in stages.items():
+            before = baseline.get(size, {}).get(name)
+            if not before:
+                continue
+            # Stages this short are mostly timer noise
+            slower = result["rows_per_second"] < before["rows_per_second"] * (
+                1 - tolerance
+            )
+            if slower and before["seconds"] >= MIN_TIMED_SECONDS:
+                found.append(
+                    f"{size} rows {name}: {result['rows_per_second']:.0f} rows/s, "
+                    f"baseline {before['rows_per_second']:.0f}"
+                )
+            if result["peak_mb"] > before["peak_mb"] * (1 + tolerance) + 0.5:
+                found.append(
+                    f"{size} rows {name}: peak {result['peak_mb']:.1f} MB, "
+                    f"baseline {before['peak_mb']:.1f}"
+                )
+    return found
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default=DEFAULT_SIZES,
+        help="Comma-separated row counts, e.g. 1000,10000,100000,1000000",
+    )
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save_baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    current: Dict[str, Dict[str, Dict[str, float]]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(s) for s in args.sizes.split(",")):
+            current[str(size)] = measure(size, Path(tmp), seed=args.seed)
+            print(f"{size} rows")
+            for name, result in current[str(size)].items():
+                print(
+                    f"  {name:<18} {result['seconds']:>9.3f}s "
+                    f"{result['rows_per_second']:>12.0f} rows/s "
+                    f"{result['peak_mb']:>9.1f} MB"
+                )
+
+    if args.save_baseline:
+        stored: Dict[str, Any] = {}
+        if args.baseline.exists():
+            stored = json.loads(args.baseline.read_text(encoding="utf-8"))
+        stored.setdefault("results", {}).update(current)
+        stored["machine"] = platform.platform()
+        stored["python"] = platform.python_version()
+        args.baseline.write_text(json.dumps(stored, indent=2), encoding="utf-8")
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline}; rerun with --save_baseline")
+        return 0
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    found = regressions(current, baseline.get("results", {}), args.tolerance)
+    for line in found:
+        print(f"REGRESSION {line}")
+    if not found:
+        print(f"no regressions against {args.baseline}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
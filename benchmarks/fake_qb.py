@@ -0,0 +1,159 @@
+"""In-memory stand-in for the QuickBooks request processor.
+
+:class:`FakeQuickBooks` has the COM methods the connector calls and answers
+``DepositQueryRq`` with synthetic deposits carrying every element a real
+``DepositRet`` has, so benchmarks can measure response sizes and parse times
+without QuickBooks. ``IncludeRetElement`` and ``TxnID`` filters are honoured
+the way QuickBooks honours them.
+"""
+
+from __future__ import annotations
+
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from typing import Iterator, List, Sequence, Tuple
+
+from src.qbxml import escape_xml
+
+# A deposit as (TxnID, TimeModified, record id, amount, chart of account)
+FakeDeposit = Tuple[str, str, str, float, str]
+
+
+def make_deposits(count: int, bank_account: str = "Chase") -> List[FakeDeposit]:
+    """Return ``count`` synthetic deposits into ``bank_account``."""
+
+    return [
+        (
+            f"{1000 + i:X}-1700000000",
+            f"2025-11-{1 + i % 28:02d}T09:{i % 60:02d}:00-08:00",
+            str(7000 + i),
+            round(10 + (i * 37) % 5000 + (i % 100) / 100, 2),
+            ("Misc Credits", "Rental", "Interest Income")[i % 3],
+        )
+        for i in range(count)
+    ]
+
+
+def _deposit_ret(deposit: FakeDeposit, bank_account: str) -> List[Tuple[str, str]]:
+    """Return the top-level elements of a full ``DepositRet`` in schema order."""
+
+    txn_id, time_modified, record_id, amount, account = deposit
+    bank = escape_xml(bank_account)
+    return [
+        ("TxnID", f"<TxnID>{txn_id}</TxnID>"),
+        ("TimeCreated", f"<TimeCreated>{time_modified}</TimeCreated>"),
+        ("TimeModified", f"<TimeModified>{time_modified}</TimeModified>"),
+        ("EditSequence", "<EditSequence>1700000000</EditSequence>"),
+        ("TxnDate", f"<TxnDate>{time_modified[:10]}</TxnDate>"),
+        (
+            "DepositToAccountRef",
+            "<DepositToAccountRef><ListID>80000001-1700000000</ListID>"
+            f"<FullName>{bank}</FullName></DepositToAccountRef>",
+        ),
+        ("Memo", f"<Memo>Deposit {record_id}</Memo>"),
+        ("DepositTotal", f"<DepositTotal>{amount:.2f}</DepositTotal>"),
+        (
+            "CurrencyRef",
+            "<CurrencyRef><ListID>80000002-1700000000</ListID>"
+            "<FullName>US Dollar</FullName></CurrencyRef>",
+        ),
+        ("ExchangeRate", "<ExchangeRate>1</ExchangeRate>"),
+        (
+            "DepositTotalInHomeCurrency",
+            f"<DepositTotalInHomeCurrency>{amount:.2f}</DepositTotalInHomeCurrency>",
+        ),
+        (
+            "DepositLineRet",
+            "<DepositLineRet>"
+            f"<TxnLineID>{txn_id}-1</TxnLineID>"
+            "<PaymentMethodRef><ListID>80000003-1700000000</ListID>"
+            "<FullName>Check</FullName></PaymentMethodRef>"
+            f"<Memo>{escape_xml(record_id)}</Memo>"
+            f"<CheckNumber>{record_id}</CheckNumber>"
+            "<ClassRef><ListID>80000004-1700000000</ListID>"
+            "<FullName>Operations:Fundraising</FullName></ClassRef>"
+            "<AccountRef><ListID>80000005-1700000000</ListID>"
+            f"<FullName>{escape_xml(account)}</FullName></AccountRef>"
+            f"<Amount>{amount:.2f}</Amount>"
+            "</DepositLineRet>",
+        ),
+        (
+            "DataExtRet",
+            "<DataExtRet><OwnerID>0</OwnerID><DataExtName>Source</DataExtName>"
+            "<DataExtType>STR255TYPE</DataExtType>"
+            "<DataExtValue>Imported from donor workbook</DataExtValue></DataExtRet>",
+        ),
+    ]
+
+
+def deposit_query_response(
+    deposits: Sequence[FakeDeposit],
+    bank_account: str = "Chase",
+    include: Sequence[str] = (),
+) -> str:
+    """Return a ``DepositQueryRs`` document listing ``deposits``.
+
+    When ``include`` is given only those top-level elements are returned.
+    """
+
+    wanted = set(include)
+    parts = [
+        '<?xml version="1.0" ?>\n<QBXML>\n<QBXMLMsgsRs>\n'
+        '<DepositQueryRs requestID="0" statusCode="0" statusSeverity="Info" '
+        'statusMessage="Status OK">\n'
+    ]
+    for deposit in deposits:
+        parts.append("<DepositRet>")
+        parts.extend(
+            element
+            for name, element in _deposit_ret(deposit, bank_account)
+            if not wanted or name in wanted
+        )
+        parts.append("</DepositRet>\n")
+    parts.append("</DepositQueryRs>\n</QBXMLMsgsRs>\n</QBXML>\n")
+    return "".join(parts)
+
+
+class FakeQuickBooks:
+    """Answers deposit queries from a fixed list of synthetic deposits."""
+
+    def __init__(
+        self, deposits: Sequence[FakeDeposit], bank_account: str = "Chase"
+    ) -> None:
+        self.deposits = list(deposits)
+        self.bank_account = bank_account
+        self.requests: List[str] = []
+        self.response_bytes = 0
+
+    def OpenConnection2(self, *args: object) -> None:  # noqa: N802 - COM name
+        pass
+
+    def BeginSession(self, *args: object) -> str:  # noqa: N802 - COM name
+        return "ticket"
+
+    def EndSession(self, ticket: str) -> None:  # noqa: N802 - COM name
+        pass
+
+    def CloseConnection(self) -> None:  # noqa: N802 - COM name
+        pass
+
+    def ProcessRequest(self, ticket: str, qbxml: str) -> str:  # noqa: N802
+        self.requests.append(qbxml)
+        query = ET.fromstring(qbxml).find(".//DepositQueryRq")
+        if query is None:
+            raise ValueError("FakeQuickBooks only answers DepositQueryRq")
+        txn_ids = {e.text for e in query.findall("TxnID")}
+        deposits = [d for d in self.deposits if not txn_ids or d[0] in txn_ids]
+        include = [e.text or "" for e in query.findall("IncludeRetElement")]
+        response = deposit_query_response(deposits, self.bank_account, include)
+        self.response_bytes += len(response.encode("utf-8"))
+        return response
+
+    @contextmanager
+    def session(self) -> Iterator[Tuple["FakeQuickBooks", str]]:
+        """Drop-in replacement for ``qb_reader._qb_session``."""
+
+        yield self, "ticket"
+
+
+__all__ = ["FakeQuickBooks", "FakeDeposit", "make_deposits", "deposit_query_response"]
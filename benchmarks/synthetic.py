@@ -0,0 +1,171 @@
+"""Synthetic workbooks and QuickBooks responses at production scale.
+
+``company_data.xlsx`` is a small sample. :func:`generate` produces any number
+of rows shaped like its "account credit nonvendor" worksheet, together with
+the QuickBooks deposits a sync would find: a ``duplicate_ratio`` of the rows
+is already in QuickBooks unchanged, a ``conflict_ratio`` is there with a
+different amount, and ``qb_only_ratio`` adds deposits missing from Excel.
+The rest are new. Run from the repository root to write a pair of files:
+
+    python -m benchmarks.synthetic --rows 100000 --out build/synthetic
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Tuple
+
+from openpyxl import Workbook
+
+from benchmarks.fake_qb import FakeDeposit, deposit_query_response
+from src.excel_reader import DEFAULT_SHEET
+from src.qb_reader import DEPOSIT_RET_ELEMENTS
+
+# Header row of the sample worksheet, in the same order
+HEADERS = (
+    "Parent ID",
+    "Child ID",
+    "Invoice Date",
+    "Invoice Amount",
+    "Bank Date",
+    "Customer",
+    "Check Amount",
+    "Tier 2 - Chart of Account ID",
+    "Tier 2 - Chart of Account",
+    "Check Num",
+    "Comment",
+    "Tier 1 - Type",
+    "APO Status",
+    "Account Receivable",
+)
+ACCOUNTS = (
+    ("31400", "Shareholder Distributions", "Equity"),
+    ("68000", "Taxes-Property", "Expense"),
+    ("47900", "Rental", "Income"),
+    ("48000", "Misc Credits", "Income"),
+    ("70100", "Interest Income", "Other Income"),
+)
+# (Parent ID, Child ID, Check Amount, Tier 2 - Chart of Account)
+ExcelRow = Tuple[str, str, float, str]
+
+
+@dataclass(slots=True)
+class SyntheticData:
+    excel_rows: List[ExcelRow] = field(default_factory=list)
+    qb_deposits: List[FakeDeposit] = field(default_factory=list)
+
+
+def generate(
+    rows: int,
+    *,
+    duplicate_ratio: float = 0.5,
+    conflict_ratio: float = 0.05,
+    qb_only_ratio: float = 0.01,
+    seed: int = 0,
+) -> SyntheticData:
+    """Return ``rows`` Excel rows and the QuickBooks deposits matching them."""
+
+    if duplicate_ratio + conflict_ratio > 1:
+        raise ValueError("duplicate_ratio + conflict_ratio must not exceed 1")
+    rng = random.Random(seed)
+    data = SyntheticData()
+    modified = datetime(2025, 11, 1, 9, 0)
+
+    def _deposit(index: int, record_id: str, amount: float, account: str) -> None:
+        time_modified = (modified + timedelta(seconds=index)).isoformat() + "-08:00"
+        data.qb_deposits.append(
+            (f"{index:X}-1700000000", time_modified, record_id, amount, account)
+        )
+
+    duplicates = round(rows * duplicate_ratio)
+    conflicts = round(rows * conflict_ratio)
+    for index in range(rows):
+        record_id = str(10_000 + index)
+        amount = rng.randint(100, 2_000_000) / 100
+        account = ACCOUNTS[rng.randrange(len(ACCOUNTS))][1]
+        data.excel_rows.append((str(5000 + index // 4), record_id, amount, account))
+        if index < duplicates:
+            _deposit(index, record_id, amount, account)
+        elif index < duplicates + conflicts:
+            _deposit(index, record_id, round(amount + 1.25, 2), account)
+    for extra in range(round(rows * qb_only_ratio)):
+        index = rows + extra
+        account = ACCOUNTS[extra % len(ACCOUNTS)][1]
+        _deposit(index, str(10_000 + index), rng.randint(100, 99_999) / 100, account)
+
+    # Shuffle so matches, conflicts and new rows are spread through the sheet
+    rng.shuffle(data.excel_rows)
+    return data
+
+
+def write_workbook(path: Path, excel_rows: List[ExcelRow]) -> Path:
+    """Write ``excel_rows`` as an "account credit nonvendor" worksheet."""
+
+    accounts = {name: (number, kind) for number, name, kind in ACCOUNTS}
+    bank_date = datetime(2024, 12, 31)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(DEFAULT_SHEET)
+    sheet.append(HEADERS)
+    for parent_id, child_id, amount, account in excel_rows:
+        number, kind = accounts[account]
+        sheet.append(
+            (
+                parent_id,
+                child_id,
+                None,
+                None,
+                bank_date,
+                None,
+                amount,
+                number,
+                account,
+                None,
+                "synthetic",
+                kind,
+                "Closed",
+                None,
+            )
+        )
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    workbook.save(path)
+    return path
+
+
+def qb_response(deposits: List[FakeDeposit], bank_account: str = "Chase") -> str:
+    """Return the trimmed ``DepositQueryRs`` QuickBooks would send for ``deposits``."""
+
+    return deposit_query_response(deposits, bank_account, DEPOSIT_RET_ELEMENTS)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--duplicate_ratio", type=float, default=0.5)
+    parser.add_argument("--conflict_ratio", type=float, default=0.05)
+    parser.add_argument("--qb_only_ratio", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=Path("build/synthetic"))
+    args = parser.parse_args(argv)
+
+    data = generate(
+        args.rows,
+        duplicate_ratio=args.duplicate_ratio,
+        conflict_ratio=args.conflict_ratio,
+        qb_only_ratio=args.qb_only_ratio,
+        seed=args.seed,
+    )
+    workbook = write_workbook(args.out / f"synthetic_{args.rows}.xlsx", data.excel_rows)
+    response = args.out / f"synthetic_{args.rows}_deposits.xml"
+    response.write_text(qb_response(data.qb_deposits), encoding="utf-8")
+    print(f"wrote {workbook} ({len(data.excel_rows)} rows)")
+    print(f"wrote {response} ({len(data.qb_deposits)} deposits)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
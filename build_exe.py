@@ -1,5 +1,10 @@
+import multiprocessing
+
 from src.cli import main
 
 
 if __name__ == "__main__":
+    # Workbooks are parsed in worker processes, which a frozen exe can only
+    # start with freeze_support().
+    multiprocessing.freeze_support()
     main()
@@ -15,8 +15,19 @@ def main(argv: list[str] | None = None) -> int:
     )
     parser.add_argument(
         "--workbook",
-        required=True,
-        help="Excel workbook containing the other income worksheet",
+        nargs="+",
+        help=(
+            "Excel workbook(s) containing the other income worksheet; "
+            "glob patterns such as 'data/*.xlsx' are expanded"
+        ),
+    )
+    parser.add_argument(
+        "--sheet",
+        action="append",
+        help=(
+            "Worksheet to read from each workbook; repeat for several "
+            "(defaults to 'account credit nonvendor')"
+        ),
     )
     parser.add_argument(
         "--bank_account",
@@ -28,8 +39,34 @@ def main(argv: list[str] | None = None) -> int:
         ),
     )
     parser.add_argument("--output", help="Optional JSON output path")
+    parser.add_argument(
+        "--report_db",
+        help="Also write the report rows to this SQLite database for querying",
+    )
+    parser.add_argument(
+        "--refresh_references",
+        action="store_true",
+        help="Re-fetch the cached QuickBooks account list",
+    )
+
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--resume",
+        action="store_true",
+        help="Finish an interrupted run from the journal instead of a workbook",
+    )
+    mode.add_argument(
+        "--plan",
+        help="Write the sync plan to this path without adding anything to QuickBooks",
+    )
+    mode.add_argument(
+        "--apply",
+        help="Execute a plan written by --plan, if its inputs are unchanged",
+    )
 
     args = parser.parse_args(argv)
+    if not args.workbook and not (args.resume or args.apply):
+        parser.error("--workbook is required unless --resume or --apply is given")
 
     # Decide how to interpret --bank_account. If running as a frozen exe, the
     # user will pass the bank account name directly. When running as Python the
@@ -46,9 +83,15 @@ def main(argv: list[str] | None = None) -> int:
         bank_account_arg = args.bank_account or "src/input_settings.json"
 
     path = run_misc_income(
-        Path(args.workbook),
+        args.workbook,
         bank_account_json=bank_account_arg,
         output_path=args.output,
+        refresh_references=args.refresh_references,
+        resume=args.resume,
+        plan_path=Path(args.plan) if args.plan else None,
+        apply_path=Path(args.apply) if args.apply else None,
+        sheets=args.sheet,
+        report_db_path=Path(args.report_db) if args.report_db else None,
     )
     print(f"Report written to {path}")
     return 0
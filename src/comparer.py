@@ -7,10 +7,18 @@ from src.models import MiscIncome, ComparisonReport, Conflict
 from src.excel_reader import extract_deposits
 from src.qb_reader import fetch_deposit_lines
 from src.qb_adder import add_misc_income
+from src.validation import income_cents, validate_deposits
 
 
 def compare_excel_qb(excel_data, qb_data) -> ComparisonReport:
-    """Compare Excel data with QuickBooks data."""
+    """Compare Excel data with QuickBooks data.
+
+    Each QuickBooks deposit line is matched on its record id (the line memo).
+    When several lines carry the same record id, the one that agrees with the
+    Excel row is matched and the others are reported as QuickBooks-only;
+    lines are considered in ``txn_line_id`` order so the result is the same
+    on every run.
+    """
 
     report = ComparisonReport()
     report.match_count = 0
@@ -18,49 +26,66 @@ def compare_excel_qb(excel_data, qb_data) -> ComparisonReport:
     def _key(item: MiscIncome) -> str:
         return f"{item.record_id}"
 
+    def _same(excel_item: MiscIncome, qb_item: MiscIncome) -> bool:
+        return (
+            income_cents(excel_item) == income_cents(qb_item)
+            and excel_item.chart_of_account == qb_item.chart_of_account
+            and excel_item.record_id == qb_item.record_id
+        )
+
     excel_dict = {_key(item): item for item in excel_data}
-    qb_dict = {_key(item): item for item in qb_data}
+    qb_lines: dict[str, list[MiscIncome]] = {}
+    for item in qb_data:
+        qb_lines.setdefault(_key(item), []).append(item)
 
     # Excel-only and conflicts
     for key, excel_item in excel_dict.items():
-        qb_item = qb_dict.get(key)
+        lines = qb_lines.get(key)
 
-        if not qb_item:
+        if not lines:
             report.excel_only.append(excel_item)
+            continue
+        if len(lines) > 1:
+            lines.sort(key=lambda line: line.txn_line_id or "")
+        # Check for perfect match
+        match = next((line for line in lines if _same(excel_item, line)), None)
+        if match is not None:
+            report.match_count += 1
+            lines.remove(match)
         else:
-            # Check for perfect match
-            if (
-                abs(float(excel_item.amount) - float(qb_item.amount)) < 0.001
-                and excel_item.chart_of_account == qb_item.chart_of_account
-                and excel_item.record_id == qb_item.record_id
-            ):
-                report.match_count += 1
-            else:
-                report.conflicts.append(
-                    Conflict(
-                        record_id=qb_item.record_id,
-                        qb_chart_of_account=qb_item.chart_of_account,
-                        excel_chart_of_account=excel_item.chart_of_account,
-                        qb_amount=qb_item.amount,
-                        excel_amount=excel_item.amount,
-                        reason="data_mismatch",
-                    )
+            qb_item = lines.pop(0)
+            report.conflicts.append(
+                Conflict(
+                    record_id=qb_item.record_id,
+                    qb_chart_of_account=qb_item.chart_of_account,
+                    excel_chart_of_account=excel_item.chart_of_account,
+                    qb_amount=qb_item.amount,
+                    excel_amount=excel_item.amount,
+                    reason="data_mismatch",
                 )
+            )
 
-    # QuickBooks-only
-    for key, qb_item in qb_dict.items():
-        if key not in excel_dict:
-            report.qb_only.append(qb_item)
+    # QuickBooks-only, including extra lines sharing a matched record id
+    for lines in qb_lines.values():
+        report.qb_only.extend(lines)
 
     return report
 
 
 if __name__ == "__main__":
     excel_file = Path("company_data.xlsx")
-    excel_data: List[MiscIncome] = extract_deposits(excel_file)
+    # Blank or malformed rows are rejected here, as in a full sync
+    validation = validate_deposits(extract_deposits(excel_file))
+    for rejected in validation.rejected:
+        print(rejected)
+    excel_data: List[MiscIncome] = validation.valid
     # Example: pass a bank account name for testing
     qb_data: List[MiscIncome] = fetch_deposit_lines("Chase")
-    report = compare_excel_qb(excel_data, qb_data)
+
+    from src.comparison_cache import ComparisonCache
+
+    # Reuses the stored report when neither input has changed
+    report = ComparisonCache().compare(excel_data, qb_data)
 
     print("Excel Only:")
     for item in report.excel_only:
@@ -0,0 +1,226 @@
+"""Memoised comparison results keyed by input fingerprints.
+
+A comparison depends only on the record ids, amounts and accounts of its two
+inputs, so its result can be stored under the digests of both input sets.
+When nothing has changed since the last sync the stored report is returned
+instead of being rebuilt. The validated Excel rows are stored the same way,
+under a digest of the workbook bytes, sheets and account list, so an
+unchanged workbook is not even read. Entries live in memory and on disk, one
+JSON file per entry, and are evicted by count and by age.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+from src.comparer import compare_excel_qb
+from src.fingerprints import income_digest
+from src.models import (
+    ComparisonReport,
+    Conflict,
+    MiscIncome,
+    RejectedRow,
+    ValidationResult,
+)
+from src.persistence import from_rows, read_json, to_rows, write_json
+
+DEFAULT_CACHE_DIR = Path(".misc_income_compare_cache")
+DEFAULT_MAX_ENTRIES = 16
+DEFAULT_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+_CACHE_VERSION = 2
+
+T = TypeVar("T")
+
+
+def _report_to_json(report: ComparisonReport) -> dict[str, Any]:
+    return {
+        "version": _CACHE_VERSION,
+        "excel_only": to_rows(report.excel_only),
+        "qb_only": to_rows(report.qb_only),
+        "conflicts": to_rows(report.conflicts),
+        "match_count": report.match_count,
+    }
+
+
+def _report_from_json(data: dict[str, Any]) -> ComparisonReport:
+    return ComparisonReport(
+        excel_only=from_rows(MiscIncome, data["excel_only"]),
+        qb_only=from_rows(MiscIncome, data["qb_only"]),
+        conflicts=from_rows(Conflict, data["conflicts"]),
+        match_count=int(data["match_count"]),
+    )
+
+
+def _validation_to_json(result: ValidationResult) -> dict[str, Any]:
+    return {
+        "version": _CACHE_VERSION,
+        "valid": to_rows(result.valid),
+        "rejected": to_rows(result.rejected),
+    }
+
+
+def _validation_from_json(data: dict[str, Any]) -> ValidationResult:
+    return ValidationResult(
+        valid=from_rows(MiscIncome, data["valid"]),
+        rejected=from_rows(RejectedRow, data["rejected"]),
+    )
+
+
+class ComparisonCache:
+    """Bounded cache of :class:`ComparisonReport` keyed by input digests."""
+
+    def __init__(
+        self,
+        directory: Path | None = DEFAULT_CACHE_DIR,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_age: float = DEFAULT_MAX_AGE_SECONDS,
+        now: Callable[[], float] = time.time,
+    ) -> None:
+        """``directory=None`` keeps entries in memory only."""
+
+        self.directory = Path(directory) if directory is not None else None
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._now = now
+        # key -> (stored at, report or validation); most recently used last
+        self._memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    @staticmethod
+    def key(excel_digest: str, qb_digest: str) -> str:
+        """Return the cache key for a pair of input digests."""
+
+        return hashlib.sha256(f"{excel_digest}|{qb_digest}".encode()).hexdigest()
+
+    @staticmethod
+    def validation_key(excel_digest: str) -> str:
+        """Return the cache key of the validated rows of an Excel input."""
+
+        return hashlib.sha256(f"validation|{excel_digest}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Path | None:
+        return self.directory / f"{key}.json" if self.directory else None
+
+    def get(self, key: str) -> ComparisonReport | None:
+        """Return the stored report for ``key``, or None if absent or expired."""
+
+        return self._load(key, _report_from_json)
+
+    def put(self, key: str, report: ComparisonReport) -> None:
+        """Store ``report`` under ``key`` and evict old or surplus entries."""
+
+        self._store(key, report, _report_to_json(report))
+
+    def _load(self, key: str, decode: Callable[[dict[str, Any]], T]) -> T | None:
+        current = self._now()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if current - entry[0] < self.max_age:
+                self._memory.move_to_end(key)
+                return entry[1]
+            del self._memory[key]
+
+        path = self._path(key)
+        if path is None:
+            return None
+        try:
+            stored_at = path.stat().st_mtime
+            if current - stored_at >= self.max_age:
+                path.unlink()
+                return None
+            data = read_json(path, _CACHE_VERSION)
+            if data is None:
+                return None
+            value = decode(data)
+            os.utime(path, (current, current))  # Mark as recently used
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        self._remember(key, current, value)
+        return value
+
+    def _store(self, key: str, value: object, payload: dict[str, Any]) -> None:
+        current = self._now()
+        self._remember(key, current, value)
+        path = self._path(key)
+        if path is None:
+            return
+        # Rejected amounts may be any cell value, such as a date
+        write_json(path, payload, default=str, mtime=current)
+        self._evict_files(current)
+
+    def compare(
+        self,
+        excel_data: list[MiscIncome],
+        qb_data: list[MiscIncome],
+        *,
+        excel_digest: str | None = None,
+        qb_digest: str | None = None,
+    ) -> ComparisonReport:
+        """Return ``compare_excel_qb(excel_data, qb_data)``, memoised.
+
+        Digests already computed by the caller may be passed in to avoid
+        hashing the inputs twice.
+        """
+
+        key = self.key(
+            excel_digest or income_digest(excel_data),
+            qb_digest or income_digest(qb_data),
+        )
+        report = self.get(key)
+        if report is None:
+            report = compare_excel_qb(excel_data, qb_data)
+            self.put(key, report)
+        return report
+
+    def validate(
+        self, excel_digest: str, build: Callable[[], ValidationResult]
+    ) -> ValidationResult:
+        """Return the validated Excel rows for ``excel_digest``, memoised.
+
+        ``build`` reads and validates the rows on a miss. ``excel_digest``
+        must cover everything they depend on - the workbook bytes, the
+        sheets read and the account list - since a hit skips reading the
+        workbook entirely.
+        """
+
+        key = self.validation_key(excel_digest)
+        result = self._load(key, _validation_from_json)
+        if result is None:
+            result = build()
+            self._store(key, result, _validation_to_json(result))
+        return result
+
+    def _remember(self, key: str, stored_at: float, value: object) -> None:
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_files(self, current: float) -> None:
+        assert self.directory is not None
+        entries: list[tuple[float, Path]] = []
+        for path in self.directory.glob("*.json"):
+            try:
+                modified = path.stat().st_mtime
+            except OSError:
+                continue
+            if current - modified >= self.max_age:
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((modified, path))
+        entries.sort()
+        for _, path in entries[: max(len(entries) - self.max_entries, 0)]:
+            path.unlink(missing_ok=True)
+
+
+__all__ = [
+    "ComparisonCache",
+    "DEFAULT_CACHE_DIR",
+    "DEFAULT_MAX_ENTRIES",
+    "DEFAULT_MAX_AGE_SECONDS",
+]
@@ -0,0 +1,176 @@
+"""Incremental reads of QuickBooks deposits.
+
+The deposits of the bank account, each with its ``TxnID``, ``EditSequence``
+and ``TimeModified``, are kept on disk between runs. A later run first sends
+a cheap probe that lists only the version stamps of deposits modified, and
+the TxnIDs of deposits deleted, since the newest ``TimeModified`` already
+seen. When nothing changed the snapshot is used as is; otherwise only the
+changed deposits are fetched in full and merged in.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Iterable, Mapping
+
+from src.fingerprints import income_digest
+from src.models import MiscIncome, QBDeposit
+from src.persistence import from_rows, read_json, to_rows, write_json
+from src.qb_reader import fetch_deposits, probe_deposit_changes
+
+DEFAULT_SNAPSHOT_PATH = Path(".misc_income_deposits.json")
+# A full read is still done at least this often, to pick up deposits that
+# stopped touching the bank account and so never show up in a probe.
+DEFAULT_MAX_AGE_SECONDS = 24 * 60 * 60
+# Probes reach this far back before the newest TimeModified already seen, so
+# deposits saved in the same second are not missed.
+PROBE_OVERLAP = timedelta(minutes=1)
+_SNAPSHOT_VERSION = 3
+
+
+@dataclass(slots=True)
+class DepositSnapshot:
+    bank_key: str
+    deposits: dict[str, QBDeposit] = field(default_factory=dict)
+    watermark: str = ""
+    digest: str = ""
+    fetched_at: float = 0.0
+
+    def incomes(self) -> list[MiscIncome]:
+        """Return every deposit line in the snapshot."""
+
+        return [line for deposit in self.deposits.values() for line in deposit.lines]
+
+
+def _parse_time(value: str) -> datetime | None:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _latest(deposits: Iterable[QBDeposit]) -> str:
+    """Return the newest ``TimeModified`` of ``deposits``, or ""."""
+
+    latest: tuple[datetime, str] | None = None
+    for deposit in deposits:
+        parsed = _parse_time(deposit.time_modified)
+        if parsed is not None and (latest is None or parsed > latest[0]):
+            latest = (parsed, deposit.time_modified)
+    return latest[1] if latest else ""
+
+
+def _read_snapshot(path: Path) -> DepositSnapshot | None:
+    data = read_json(path, _SNAPSHOT_VERSION)
+    if data is None:
+        return None
+    try:
+        deposits = {
+            txn_id: QBDeposit(
+                txn_id=txn_id,
+                edit_sequence=edit_sequence,
+                time_modified=time_modified,
+                lines=from_rows(MiscIncome, lines),
+            )
+            for txn_id, edit_sequence, time_modified, lines in data["deposits"]
+        }
+    except (KeyError, TypeError, ValueError):
+        return None
+    return DepositSnapshot(
+        bank_key=str(data.get("bank_key") or ""),
+        deposits=deposits,
+        watermark=str(data.get("watermark") or ""),
+        digest=str(data.get("digest") or ""),
+        fetched_at=float(data.get("fetched_at") or 0.0),
+    )
+
+
+def _write_snapshot(path: Path, snapshot: DepositSnapshot) -> None:
+    write_json(
+        path,
+        {
+            "version": _SNAPSHOT_VERSION,
+            "bank_key": snapshot.bank_key,
+            "watermark": snapshot.watermark,
+            "digest": snapshot.digest,
+            "fetched_at": snapshot.fetched_at,
+            # [TxnID, EditSequence, TimeModified, lines] rows
+            "deposits": [
+                [d.txn_id, d.edit_sequence, d.time_modified, to_rows(d.lines)]
+                for d in snapshot.deposits.values()
+            ],
+        },
+    )
+
+
+def sync_deposits(
+    bank_account: str,
+    account_ids: Mapping[str, str] | None = None,
+    path: Path = DEFAULT_SNAPSHOT_PATH,
+    *,
+    max_age: float = DEFAULT_MAX_AGE_SECONDS,
+    refresh: bool = False,
+    fetch: Callable[..., list[QBDeposit]] = fetch_deposits,
+    probe: Callable[..., tuple[dict[str, tuple[str, str]], list[str]]] = (
+        probe_deposit_changes
+    ),
+    now: Callable[[], float] = time.time,
+) -> DepositSnapshot:
+    """Return the current deposits of ``bank_account``, read incrementally.
+
+    The snapshot at ``path`` is brought up to date with one probe and, only
+    if something changed, one fetch of the changed deposits. A full read is
+    done instead when there is no usable snapshot, it belongs to another
+    account, it is older than ``max_age`` seconds, or ``refresh`` is set.
+    """
+
+    path = Path(path)
+    bank_key = (account_ids or {}).get(bank_account, bank_account)
+    current = now()
+    snapshot = None if refresh else _read_snapshot(path)
+
+    if (
+        snapshot is None
+        or snapshot.bank_key != bank_key
+        or _parse_time(snapshot.watermark) is None
+        or current - snapshot.fetched_at >= max_age
+    ):
+        snapshot = DepositSnapshot(
+            bank_key=bank_key,
+            deposits={d.txn_id: d for d in fetch(bank_account, account_ids)},
+            fetched_at=current,
+        )
+    else:
+        watermark = datetime.fromisoformat(snapshot.watermark)
+        since = (watermark - PROBE_OVERLAP).isoformat(timespec="seconds")
+        modified, deleted = probe(bank_account, since, account_ids)
+        changed = [
+            txn_id
+            for txn_id, (edit_sequence, _) in modified.items()
+            if txn_id not in snapshot.deposits
+            or snapshot.deposits[txn_id].edit_sequence != edit_sequence
+        ]
+        gone = [txn_id for txn_id in deleted if txn_id in snapshot.deposits]
+        if not changed and not gone:
+            return snapshot
+        for txn_id in (*gone, *changed):
+            snapshot.deposits.pop(txn_id, None)
+        if changed:
+            for deposit in fetch(bank_account, account_ids, changed):
+                snapshot.deposits[deposit.txn_id] = deposit
+
+    snapshot.watermark = _latest(snapshot.deposits.values())
+    snapshot.digest = income_digest(snapshot.incomes())
+    _write_snapshot(path, snapshot)
+    return snapshot
+
+
+__all__ = [
+    "DepositSnapshot",
+    "sync_deposits",
+    "DEFAULT_SNAPSHOT_PATH",
+    "DEFAULT_MAX_AGE_SECONDS",
+]
@@ -1,54 +1,153 @@
 from __future__ import annotations
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Any, Iterable, List, Sequence
 from openpyxl import load_workbook
 from src.models import MiscIncome
 
+DEFAULT_SHEET = "account credit nonvendor"
 
-def extract_deposits(workbook_path: Path) -> List[MiscIncome]:
-    """Extract deposit-related data from company_data.xlsx"""
+# A parsed worksheet as parallel columns: (record ids, amounts, accounts).
+# Plain lists of cell values pickle far smaller and faster than dataclasses
+# when sent back from a worker process.
+SheetBatch = tuple[list[Any], list[Any], list[Any]]
+
+
+def _read_sheet(workbook_path: Path, sheet_name: str) -> SheetBatch:
+    """Read one worksheet into a compact column batch."""
+
+    wb = load_workbook(filename=workbook_path, read_only=True, data_only=True)
+    try:
+        if sheet_name not in wb.sheetnames:
+            raise ValueError(f"Worksheet '{sheet_name}' not found in {workbook_path}")
+        sheet = wb[sheet_name]
+
+        rows = sheet.iter_rows(values_only=True)
+        headers = [str(h).strip() if h else "" for h in next(rows, [])]
+        header_index = {h: i for i, h in enumerate(headers)}
+
+        def _value(row, column):
+            idx = header_index.get(column)
+            if idx is None or idx >= len(row):
+                return None
+            return row[idx]
+
+        record_ids: list[Any] = []
+        amounts: list[Any] = []
+        accounts: list[Any] = []
+        for row in rows:
+            parent_id = _value(row, "Parent ID")
+            if not parent_id:
+                continue
+            record_ids.append(_value(row, "Child ID") or "")
+            amounts.append(_value(row, "Check Amount"))
+            # account_type_ = _value(row, "Tier 1 - Type") or ""
+            accounts.append(_value(row, "Tier 2 - Chart of Account") or "")
+    finally:
+        wb.close()
+    return record_ids, amounts, accounts
+
+
+def _batch_to_records(batch: SheetBatch) -> Iterable[MiscIncome]:
+    for record_id, amount, account in zip(*batch):
+        yield MiscIncome(
+            amount=amount,
+            record_id=record_id,
+            chart_of_account=account,
+            source="excel",
+        )
+
+
+def extract_deposits(
+    workbook_path: Path, sheets: Sequence[str] | None = None
+) -> List[MiscIncome]:
+    """Extract deposit-related data from company_data.xlsx
+
+    Cell values are passed through as read; blank or malformed amounts are
+    left for :func:`src.validation.validate_deposits` to reject.
+    """
     workbook_path = Path(workbook_path)
     if not workbook_path.exists():
         raise FileNotFoundError(f"Workbook not found: {workbook_path}")
 
-    wb = load_workbook(filename=workbook_path, read_only=True, data_only=True)
-    # Access the worksheet by name. wb.sheetnames is a list of names, not a mapping.
-    sheet = wb["account credit nonvendor"]
-
-    rows = sheet.iter_rows(values_only=True)
-    headers = [str(h).strip() if h else "" for h in next(rows, [])]
-    header_index = {h: i for i, h in enumerate(headers)}
-
-    def _value(row, column):
-        idx = header_index.get(column)
-        if idx is None or idx >= len(row):
-            return None
-        return row[idx]
-
-    records = []
-    for row in rows:
-        parent_id = _value(row, "Parent ID")
-        if not parent_id:
+    records: List[MiscIncome] = []
+    for sheet_name in sheets or [DEFAULT_SHEET]:
+        records.extend(_batch_to_records(_read_sheet(workbook_path, sheet_name)))
+    return records
+
+
+def resolve_workbooks(patterns: Iterable[str | Path]) -> List[Path]:
+    """Expand workbook paths and glob patterns into a sorted list of files."""
+
+    workbooks: set[Path] = set()
+    for pattern in patterns:
+        text = str(pattern)
+        # Existing files are taken literally, e.g. "company_data[1].xlsx"
+        if any(ch in text for ch in "*?[") and not Path(text).exists():
+            matches = glob.glob(text, recursive=True)
+            if not matches:
+                raise FileNotFoundError(f"No workbooks match: {text}")
+            workbooks.update(Path(match) for match in matches)
             continue
-        memo_ = _value(row, "Child ID") or ""
-        amount_ = float(_value(row, "Check Amount")) or 0.0
-        # account_type_ = _value(row, "Tier 1 - Type") or ""
-        chart_of_account_ = _value(row, "Tier 2 - Chart of Account") or ""
-
-        records.append(
-            MiscIncome(
-                amount=amount_,
-                record_id=memo_,
-                chart_of_account=chart_of_account_,
-                source="excel",
-            )
-        )
+        path = Path(text)
+        if not path.exists():
+            raise FileNotFoundError(f"Workbook not found: {path}")
+        workbooks.add(path)
+    return sorted(workbooks)
 
-    wb.close()
+
+def extract_deposits_many(
+    workbooks: Iterable[str | Path],
+    sheets: Sequence[str] | None = None,
+    max_workers: int | None = None,
+) -> List[MiscIncome]:
+    """Extract deposits from several workbooks and worksheets in parallel.
+
+    Each (workbook, sheet) pair is parsed in its own worker process. A row
+    repeated in another workbook with the same record id, amount and account
+    is kept once, since period workbooks often overlap; repeats within one
+    workbook, and rows that share a record id but differ, are all kept so
+    that validation can reject them as duplicates.
+    """
+
+    jobs = [
+        (path, sheet_name)
+        for path in resolve_workbooks(workbooks)
+        for sheet_name in sheets or [DEFAULT_SHEET]
+    ]
+    workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        batches = [_read_sheet(path, sheet_name) for path, sheet_name in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            batches = list(pool.map(_read_sheet, *zip(*jobs)))
+
+    records: List[MiscIncome] = []
+    # (record id, amount, account) -> workbook it was first read from
+    seen: dict[tuple[str, object, str], Path] = {}
+    for (path, _), batch in zip(jobs, batches):
+        for income in _batch_to_records(batch):
+            amount = income.amount
+            key = (
+                str(income.record_id),
+                float(amount) if isinstance(amount, (int, float)) else str(amount),
+                str(income.chart_of_account),
+            )
+            if seen.setdefault(key, path) != path:
+                continue
+            records.append(income)
     return records
 
 
-__all__ = ["extract_deposits", "MiscIncome"]
+__all__ = [
+    "extract_deposits",
+    "extract_deposits_many",
+    "resolve_workbooks",
+    "DEFAULT_SHEET",
+    "MiscIncome",
+]
 
 
 if __name__ == "__main__":  # pragma: no cover - manual invocation
@@ -56,9 +155,13 @@ if __name__ == "__main__":  # pragma: no cover - manual invocation
 
     # Allow running as a script: poetry run python src/excel_reader.py
     try:
-        misc_incomes = extract_deposits(Path("company_data.xlsx"))
-        for income in misc_incomes:
+        from src.validation import validate_deposits
+
+        validation = validate_deposits(extract_deposits(Path("company_data.xlsx")))
+        for income in validation.valid:
             print(income)
+        for rejected in validation.rejected:
+            print(rejected)
     except Exception as e:
         print(f"Error: {e}")
         print("Usage: python src/excel_reader.py <path-to-workbook.xlsx>")
@@ -0,0 +1,60 @@
+"""Stable digests of sync inputs.
+
+Digests identify a workbook or a set of deposits without keeping the data
+itself, so that plans and cached comparisons can tell whether their inputs
+have changed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import Iterable
+
+from src.models import MiscIncome
+from src.validation import income_cents
+
+_READ_SIZE = 1 << 20
+
+
+def workbook_digest(paths: Iterable[Path]) -> str:
+    """Return a SHA-256 digest over the bytes of the given workbooks.
+
+    The files are hashed as raw bytes; they are not parsed.
+    """
+
+    digest = hashlib.sha256()
+    for path in sorted(Path(p) for p in paths):
+        digest.update(str(path.name).encode("utf-8") + b"\0")
+        with path.open("rb") as handle:
+            while chunk := handle.read(_READ_SIZE):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def income_digest(items: Iterable[MiscIncome]) -> str:
+    """Return an order-independent digest of a set of incomes.
+
+    Each income is reduced to ``(record_id, cents, chart_of_account,
+    customer_name, txn_line_id)``; the keys are sorted and hashed in one
+    SHA-256 pass, which is several times cheaper than hashing each row
+    separately.
+    """
+
+    keys = sorted(
+        f"{item.record_id}\x1f{income_cents(item)}"
+        f"\x1f{item.chart_of_account}\x1f{item.customer_name}"
+        f"\x1f{item.txn_line_id or ''}"
+        for item in items
+    )
+    digest = hashlib.sha256("\n".join(keys).encode("utf-8"))
+    return f"{len(keys):x}-{digest.hexdigest()}"
+
+
+def digest_parts(*parts: str) -> str:
+    """Return a SHA-256 digest of an ordered sequence of strings."""
+
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+__all__ = ["workbook_digest", "income_digest", "digest_parts"]
@@ -0,0 +1,295 @@
+"""Append-only write-ahead journal for QuickBooks deposit adds.
+
+Every chunk of deposits passes through up to four stages, each recorded as
+one JSON line before the run moves on:
+
+* ``intended`` - the chunk and its records, written for every chunk before
+  anything is sent;
+* ``sent`` - written immediately before the chunk is handed to QuickBooks;
+* ``acknowledged`` - QuickBooks answered; carries the TxnID of each added
+  record and the error of each record QuickBooks rejected;
+* ``failed`` - the chunk was never processed by QuickBooks.
+
+Replaying the journal tells an interrupted run which records were never sent
+or failed (safe to send again) and which were sent without an answer (in
+doubt: they must be looked up in QuickBooks before being sent again).
+
+The journal is compacted after every run: once nothing is pending it is
+moved aside to ``<name>.1``, otherwise it is rewritten with only the records
+still pending, so replaying it never costs more than the unfinished work.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Mapping
+
+from src.models import MiscIncome
+from src.reporting import iso_timestamp
+
+DEFAULT_JOURNAL_PATH = Path(".misc_income_journal.jsonl")
+# Stages after which a record may still need to be added
+_PENDING_STAGES = ("intended", "sent", "failed")
+
+
+@dataclass(slots=True)
+class PendingRecords:
+    """Records of interrupted runs that have not reached a final stage."""
+
+    bank_account: str | None = None
+    unsent: list[MiscIncome] = field(default_factory=list)
+    in_doubt: list[MiscIncome] = field(default_factory=list)
+    # run id and chunk index of every pending record, keyed by record id
+    origins: dict[str, tuple[str, int]] = field(default_factory=dict)
+    earliest_sent_at: str | None = None
+
+    def __bool__(self) -> bool:
+        return bool(self.unsent or self.in_doubt)
+
+
+def _record_to_dict(income: MiscIncome) -> dict[str, Any]:
+    return {
+        "record_id": income.record_id,
+        "amount": income.amount,
+        "chart_of_account": income.chart_of_account,
+    }
+
+
+def _record_from_dict(data: Mapping[str, Any]) -> MiscIncome:
+    return MiscIncome(
+        record_id=str(data["record_id"]),
+        amount=float(data["amount"]),
+        chart_of_account=str(data["chart_of_account"]),
+        source="excel",
+    )
+
+
+def _write_entries(path: Path, entries: Iterable[dict[str, Any]], mode: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open(mode, encoding="utf-8") as handle:
+        for entry in entries:
+            handle.write(json.dumps(entry, separators=(",", ":")))
+            handle.write("\n")
+        handle.flush()
+        os.fsync(handle.fileno())  # Must be on disk before QB is touched
+
+
+class Journal:
+    """Durable, append-only log of deposit add stages."""
+
+    def __init__(self, path: Path = DEFAULT_JOURNAL_PATH) -> None:
+        self.path = Path(path)
+
+    def _append(self, entries: Iterable[dict[str, Any]]) -> None:
+        _write_entries(self.path, entries, "a")
+
+    def start_run(
+        self, bank_account: str, chunks: Iterable[Iterable[MiscIncome]]
+    ) -> str:
+        """Record every chunk of a new run as ``intended`` and return its id."""
+
+        run_id = uuid.uuid4().hex
+        at = iso_timestamp()
+        self._append(
+            {
+                "stage": "intended",
+                "run": run_id,
+                "chunk": index,
+                "at": at,
+                "bank_account": bank_account,
+                "records": [_record_to_dict(income) for income in chunk],
+            }
+            for index, chunk in enumerate(chunks)
+        )
+        return run_id
+
+    def sent(self, run_id: str, chunk: int) -> None:
+        """Record that ``chunk`` is about to be handed to QuickBooks."""
+
+        self._append(
+            [{"stage": "sent", "run": run_id, "chunk": chunk, "at": iso_timestamp()}]
+        )
+
+    def acknowledged(
+        self,
+        run_id: str,
+        chunk: int,
+        txn_ids: Mapping[str, str],
+        errors: Mapping[str, str] | None = None,
+    ) -> None:
+        """Record QuickBooks' answer for ``chunk``.
+
+        ``txn_ids`` maps record id to the TxnID of the deposit QuickBooks
+        created; ``errors`` maps record id to the reason it was rejected.
+        """
+
+        self._append(
+            [
+                {
+                    "stage": "acknowledged",
+                    "run": run_id,
+                    "chunk": chunk,
+                    "at": iso_timestamp(),
+                    "txn_ids": dict(txn_ids),
+                    "errors": dict(errors or {}),
+                }
+            ]
+        )
+
+    def failed(self, run_id: str, chunk: int, error: str) -> None:
+        """Record that ``chunk`` was not processed by QuickBooks."""
+
+        self._append(
+            [
+                {
+                    "stage": "failed",
+                    "run": run_id,
+                    "chunk": chunk,
+                    "at": iso_timestamp(),
+                    "error": error,
+                }
+            ]
+        )
+
+    def rotate(self) -> None:
+        """Move the journal aside to ``<name>.1``, replacing an older one."""
+
+        if self.path.exists():
+            self.path.replace(self.path.with_name(self.path.name + ".1"))
+
+    def compact(self) -> PendingRecords:
+        """Drop finished and superseded runs and return what is still pending.
+
+        With nothing pending the journal is rotated. Otherwise it is rewritten
+        with one ``intended`` entry per chunk still holding pending records,
+        followed by a ``sent`` entry for chunks in doubt, which replays to
+        the same pending records.
+        """
+
+        pending = self.pending()
+        if not pending:
+            self.rotate()
+            return pending
+
+        in_doubt = {income.record_id for income in pending.in_doubt}
+        chunks: dict[tuple[str, int], list[MiscIncome]] = {}
+        for income in (*pending.unsent, *pending.in_doubt):
+            chunks.setdefault(pending.origins[income.record_id], []).append(income)
+        at = iso_timestamp()
+        entries: list[dict[str, Any]] = []
+        for (run_id, chunk), records in chunks.items():
+            entries.append(
+                {
+                    "stage": "intended",
+                    "run": run_id,
+                    "chunk": chunk,
+                    "at": at,
+                    "bank_account": pending.bank_account,
+                    "records": [_record_to_dict(income) for income in records],
+                }
+            )
+            # Records of a chunk share a stage; resume only needs the earliest
+            # send time to look in-doubt records up
+            if records[0].record_id in in_doubt:
+                entries.append(
+                    {
+                        "stage": "sent",
+                        "run": run_id,
+                        "chunk": chunk,
+                        "at": pending.earliest_sent_at or at,
+                    }
+                )
+
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        _write_entries(tmp_path, entries, "w")
+        tmp_path.replace(self.path)
+        return pending
+
+    def _entries(self) -> Iterable[dict[str, Any]]:
+        if not self.path.exists():
+            return
+        with self.path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write; the stage it
+                    # described never completed, so it is safe to ignore.
+                    continue
+
+    def pending(self) -> PendingRecords:
+        """Replay the journal and return records left in a non-final stage."""
+
+        chunks: dict[tuple[str, int], list[MiscIncome]] = {}
+        bank_accounts: dict[str, str] = {}
+        # record id -> (stage, run id, chunk index, sent at)
+        status: dict[str, tuple[str, str, int, str | None]] = {}
+
+        for entry in self._entries():
+            key = (entry["run"], int(entry["chunk"]))
+            stage = entry["stage"]
+            if stage == "intended":
+                records = [_record_from_dict(r) for r in entry["records"]]
+                chunks[key] = records
+                bank_accounts[entry["run"]] = entry.get("bank_account") or ""
+                for income in records:
+                    status[income.record_id] = ("intended", key[0], key[1], None)
+                continue
+            txn_ids = entry.get("txn_ids") or {}
+            errors = entry.get("errors") or {}
+            for income in chunks.get(key, []):
+                current = status.get(income.record_id)
+                if current is None or (current[1], current[2]) != key:
+                    continue  # Superseded by a later run of the same record
+                if stage == "sent":
+                    status[income.record_id] = ("sent", key[0], key[1], entry["at"])
+                elif stage == "failed":
+                    status[income.record_id] = ("failed", key[0], key[1], None)
+                elif income.record_id in txn_ids:
+                    status[income.record_id] = ("acknowledged", key[0], key[1], None)
+                elif income.record_id in errors:
+                    status[income.record_id] = ("rejected", key[0], key[1], None)
+                # Records missing from an acknowledgement keep their stage
+
+        pending = PendingRecords()
+        for chunk_key, records in chunks.items():
+            for income in records:
+                stage, run_id, chunk, sent_at = status[income.record_id]
+                if (run_id, chunk) != chunk_key or stage not in _PENDING_STAGES:
+                    continue
+                pending.origins[income.record_id] = (run_id, chunk)
+                pending.bank_account = bank_accounts.get(run_id)
+                if stage != "sent":
+                    pending.unsent.append(income)
+                    continue
+                pending.in_doubt.append(income)
+                if sent_at and (
+                    pending.earliest_sent_at is None
+                    or sent_at < pending.earliest_sent_at
+                ):
+                    pending.earliest_sent_at = sent_at
+        return pending
+
+    def reconciled(self, found: Mapping[str, str], pending: PendingRecords) -> None:
+        """Acknowledge in-doubt records that were found in QuickBooks.
+
+        ``found`` maps record id to the TxnID of the matching deposit.
+        """
+
+        by_origin: dict[tuple[str, int], dict[str, str]] = {}
+        for record_id, txn_id in found.items():
+            origin = pending.origins.get(record_id)
+            if origin is not None:
+                by_origin.setdefault(origin, {})[record_id] = txn_id
+        for (run_id, chunk), txn_ids in by_origin.items():
+            self.acknowledged(run_id, chunk, txn_ids)
+
+
+__all__ = ["Journal", "PendingRecords", "DEFAULT_JOURNAL_PATH"]
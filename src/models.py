@@ -4,6 +4,14 @@ from typing import Literal
 
 SourceLiteral = Literal["excel", "quickbooks"]
 ConflictReason = Literal["data_mismatch", "missing_in_excel", "missing_in_quickbooks"]
+RejectionReason = Literal[
+    "missing_record_id",
+    "duplicate_record_id",
+    "missing_amount",
+    "invalid_amount",
+    "missing_chart_of_account",
+    "unknown_chart_of_account",
+]
 
 
 @dataclass(slots=True)
@@ -13,6 +21,10 @@ class MiscIncome:
     chart_of_account: str
     source: SourceLiteral
     customer_name: str = "Default Customer"
+    # Identifies the QuickBooks deposit line a record was read from
+    txn_line_id: str | None = None
+    # The amount in whole cents, once validated or read from QuickBooks
+    cents: int | None = None
 
     def __str__(self):
         return (
@@ -45,3 +57,31 @@ class ComparisonReport:
     qb_only: list[MiscIncome] = field(default_factory=list)
     conflicts: list[Conflict] = field(default_factory=list)
     match_count: int = 0
+
+
+@dataclass(slots=True)
+class RejectedRow:
+    record_id: str
+    amount: object
+    chart_of_account: str
+    reason: RejectionReason
+
+    def __str__(self):
+        return (
+            f"RejectedRow(record_id='{self.record_id}', amount={self.amount!r}, "
+            f"chart_of_account='{self.chart_of_account}', reason='{self.reason}')"
+        )
+
+
+@dataclass(slots=True)
+class ValidationResult:
+    valid: list[MiscIncome] = field(default_factory=list)
+    rejected: list[RejectedRow] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class QBDeposit:
+    txn_id: str
+    edit_sequence: str
+    time_modified: str
+    lines: list[MiscIncome] = field(default_factory=list)
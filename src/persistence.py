@@ -0,0 +1,84 @@
+"""JSON files shared by plans, caches and snapshots.
+
+Records are stored as compact positional rows rather than objects: a row is
+the dataclass fields in declaration order, so ``cls(*row)`` rebuilds the
+record. Files are written to a temporary file next to the target and then
+moved over it, so a crash never leaves half a file behind.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import fields
+from operator import attrgetter
+from pathlib import Path
+from typing import Any, Callable, Iterable, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+# Field getters by dataclass, built once per class
+_ROW_GETTERS: dict[type, Callable[[Any], tuple[Any, ...]]] = {}
+
+
+def _row_getter(cls: type) -> Callable[[Any], tuple[Any, ...]]:
+    getter = _ROW_GETTERS.get(cls)
+    if getter is None:
+        getter = _ROW_GETTERS[cls] = attrgetter(*(f.name for f in fields(cls)))
+    return getter
+
+
+def to_rows(items: Iterable[Any]) -> list[list[Any]]:
+    """Return each dataclass instance in ``items`` as a list of its fields."""
+
+    return [list(_row_getter(type(item))(item)) for item in items]
+
+
+def from_rows(cls: Callable[..., T], rows: Iterable[Sequence[Any]]) -> list[T]:
+    """Rebuild ``cls`` instances from rows written by :func:`to_rows`."""
+
+    return [cls(*row) for row in rows]
+
+
+def write_json(
+    path: Path,
+    payload: Any,
+    *,
+    default: Callable[[Any], Any] | None = None,
+    mtime: float | None = None,
+) -> Path:
+    """Write ``payload`` to ``path`` as compact JSON, atomically.
+
+    ``mtime``, when given, is set on the file before it replaces ``path``.
+    """
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as handle:
+        json.dump(payload, handle, separators=(",", ":"), default=default)
+    if mtime is not None:
+        os.utime(tmp_path, (mtime, mtime))
+    tmp_path.replace(path)
+    return path
+
+
+def read_json(path: Path, version: int) -> dict[str, Any] | None:
+    """Return the JSON object at ``path`` if it has format ``version``.
+
+    None is returned when the file is missing, unreadable or of another
+    version, so callers can fall back to rebuilding it.
+    """
+
+    try:
+        with Path(path).open("r", encoding="utf-8") as handle:
+            data = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != version:
+        return None
+    return data
+
+
+__all__ = ["to_rows", "from_rows", "write_json", "read_json"]
@@ -0,0 +1,103 @@
+"""Sync plans computed without writing to QuickBooks.
+
+A plan records everything a sync would do - the deposits to add, the
+conflicts found and the rows rejected by validation - together with
+fingerprints of the workbook, the QuickBooks company file and the deposits
+it was computed from. Applying a plan skips reading the workbook and
+comparing again, and is refused if any fingerprint has changed since.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from src.models import Conflict, MiscIncome, RejectedRow
+from src.persistence import from_rows, to_rows, write_json
+
+PLAN_VERSION = 2
+
+
+@dataclass(slots=True)
+class SyncPlan:
+    bank_account: str
+    workbooks: list[str]
+    workbook_digest: str
+    company_marker: str
+    deposits_digest: str
+    created_at: str
+    adds: list[MiscIncome] = field(default_factory=list)
+    conflicts: list[Conflict] = field(default_factory=list)
+    qb_only: list[MiscIncome] = field(default_factory=list)
+    rejected: list[RejectedRow] = field(default_factory=list)
+    match_count: int = 0
+
+    def check(
+        self, workbook_digest: str, company_marker: str, deposits_digest: str
+    ) -> None:
+        """Raise ``RuntimeError`` if the inputs changed since the plan was made."""
+
+        if workbook_digest != self.workbook_digest:
+            raise RuntimeError("Workbook changed since the plan was made; re-plan")
+        if company_marker != self.company_marker:
+            raise RuntimeError(
+                "QuickBooks company file changed since the plan was made; re-plan"
+            )
+        if deposits_digest != self.deposits_digest:
+            raise RuntimeError(
+                "QuickBooks deposits changed since the plan was made; re-plan"
+            )
+
+
+def write_plan(plan: SyncPlan, path: Path) -> Path:
+    """Write ``plan`` to ``path`` as compact JSON."""
+
+    payload = {
+        "version": PLAN_VERSION,
+        "bank_account": plan.bank_account,
+        "workbooks": plan.workbooks,
+        "fingerprints": {
+            "workbook": plan.workbook_digest,
+            "company": plan.company_marker,
+            "deposits": plan.deposits_digest,
+        },
+        "created_at": plan.created_at,
+        "match_count": plan.match_count,
+        "adds": to_rows(plan.adds),
+        "qb_only": to_rows(plan.qb_only),
+        "conflicts": to_rows(plan.conflicts),
+        # Rejected amounts may be any cell value, such as a date
+        "rejected": to_rows(plan.rejected),
+    }
+    return write_json(path, payload, default=str)
+
+
+def read_plan(path: Path) -> SyncPlan:
+    """Load a plan written by :func:`write_plan`."""
+
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Plan file not found: {path}")
+    with path.open("r", encoding="utf-8") as handle:
+        data = json.load(handle)
+    if data.get("version") != PLAN_VERSION:
+        raise ValueError(f"Unsupported plan version: {data.get('version')}")
+
+    fingerprints = data["fingerprints"]
+    return SyncPlan(
+        bank_account=data["bank_account"],
+        workbooks=list(data["workbooks"]),
+        workbook_digest=fingerprints["workbook"],
+        company_marker=fingerprints["company"],
+        deposits_digest=fingerprints["deposits"],
+        created_at=data["created_at"],
+        match_count=int(data["match_count"]),
+        adds=from_rows(MiscIncome, data["adds"]),
+        qb_only=from_rows(MiscIncome, data["qb_only"]),
+        conflicts=from_rows(Conflict, data["conflicts"]),
+        rejected=from_rows(RejectedRow, data["rejected"]),
+    )
+
+
+__all__ = ["SyncPlan", "write_plan", "read_plan", "PLAN_VERSION"]
@@ -1,149 +1,257 @@
 import xml.etree.ElementTree as ET
 from src.models import MiscIncome
-from contextlib import contextmanager
-from typing import Iterator, List
+from typing import List, Mapping
+from datetime import datetime, timedelta
 from src.input_settings import InputSettings
+from src.journal import Journal
+from src.qb_reader import fetch_deposits_modified_since
+from src.qb_transport import (
+    SHARED_BREAKER,
+    NotSentError,
+    QBTransport,
+    TransientQBError,
+    is_retryable_status,
+)
+from src.qb_transport import qb_session as _qb_session
+from src.qbxml import build_deposit_add_batch, iter_deposit_add_batches
+from src.reporting import iso_timestamp
 
-try:
-    import win32com.client  # type: ignore
-except ImportError:  # pragma: no cover
-    win32com = None  # type: ignore
+DEFAULT_CHUNK_SIZE = 500  # DepositAddRq elements per QBXML request
+# Allowance for clock skew between this machine and QuickBooks when looking
+# up deposits sent by an interrupted run
+RECONCILE_MARGIN = timedelta(minutes=10)
 
-APP_NAME = "Quickbooks Connector"  # do not chanege this
 
+def _parse_add_response(
+    raw_xml: str, chunk: list[MiscIncome], *, retry_in_use: bool = False
+) -> tuple[list[MiscIncome], dict[str, str], dict[str, str], list[MiscIncome]]:
+    """Match each ``DepositAddRs`` to the income that produced it.
 
-def _require_win32com() -> None:
-    if win32com is None:  # pragma: no cover - exercised via tests
-        raise RuntimeError("pywin32 is required to communicate with QuickBooks")
-
-
-@contextmanager
-def _qb_session() -> Iterator[tuple[object, object]]:
-    _require_win32com()
-    session = win32com.client.Dispatch("QBXMLRP2.RequestProcessor")
-    session.OpenConnection2("", APP_NAME, 1)
-    ticket = session.BeginSession("", 0)
-    try:
-        yield session, ticket
-    finally:
-        try:
-            session.EndSession(ticket)
-        finally:
-            session.CloseConnection()
+    QuickBooks answers requests in the order they were sent. Returns the
+    deposits QuickBooks created, their TxnIDs by record id, the error
+    message of every record QuickBooks rejected, and - when
+    ``retry_in_use`` - the records it could not save only because something
+    was in use, which are left out of the errors so they can be resent.
+    """
 
+    root = ET.fromstring(raw_xml)
+    added: List[MiscIncome] = []
+    txn_ids: dict[str, str] = {}
+    errors: dict[str, str] = {}
+    in_use: List[MiscIncome] = []
+    for income, response in zip(chunk, root.iter("DepositAddRs")):
+        status_code = int(response.get("statusCode", "0"))
+        if status_code != 0:
+            status_message = response.get("statusMessage", "")
+            print(f"QuickBooks error ({status_code}): {status_message}")
+            if retry_in_use and is_retryable_status(status_code):
+                in_use.append(income)
+            else:
+                errors[income.record_id] = status_message
+            continue
+        detail = response.find("DepositRet")
+        if detail is None:
+            continue  # Left in doubt; a resume will look it up
+        amount = detail.findtext("DepositTotal")  # Extract the amount
+        txn_ids[income.record_id] = detail.findtext("TxnID") or ""
+        added.append(
+            MiscIncome(
+                amount=float(amount) if amount else 0.0,
+                chart_of_account=str(
+                    detail.findtext("DepositLineRet/AccountRef/FullName")
+                ),
+                record_id=str(detail.findtext("DepositLineRet/Memo")),
+                source="quickbooks",
+            )
+        )
+    return added, txn_ids, errors, in_use
 
-def _send_qbxml(qbxml: str) -> ET.Element:
-    with _qb_session() as (session, ticket):
-        print(f"Sending QBXML:\n{qbxml}")  # Debug output
-        raw_response = session.ProcessRequest(ticket, qbxml)  # type: ignore[attr-defined]
-        print(f"Received response:\n{raw_response}")  # Debug output
-    return _parse_response(raw_response)
 
+def _send_chunk(
+    transport: QBTransport,
+    chunk: list[MiscIncome],
+    qbxml: str,
+    settings: InputSettings,
+    account_ids: Mapping[str, str] | None,
+    journal: Journal | None,
+    run_id: str,
+    index: int,
+) -> list[MiscIncome]:
+    """Add one chunk, resending the records QuickBooks found in use.
 
-def _parse_response(raw_xml: str) -> ET.Element:
-    root = ET.fromstring(raw_xml)
-    response = root.find(".//*[@statusCode]")
-    if response is None:
-        raise RuntimeError("QuickBooks response missing status information")
+    Raises :class:`NotSentError` if QuickBooks never processed the chunk.
+    """
 
-    status_code = int(response.get("statusCode", "0"))
-    status_message = response.get("statusMessage", "")
-    # Status code 1 means "no matching objects found" - this is OK for queries
-    if status_code != 0 and status_code != 1:
-        print(f"QuickBooks error ({status_code}): {status_message}")
-        raise RuntimeError(status_message)
-    return root
+    added_all: List[MiscIncome] = []
+    attempt = 0
+    while True:
+        try:
+            raw_response = transport.process(qbxml, idempotent=False)
+        except NotSentError as exc:
+            if attempt == 0:
+                raise
+            # The records were not saved, but the journal still has them as
+            # sent; a resume looks them up before sending them again.
+            print(f"Could not resend {len(chunk)} record(s): {exc}")
+            return added_all
+        attempt += 1
+        added, txn_ids, errors, in_use = _parse_add_response(
+            raw_response,
+            chunk,
+            retry_in_use=attempt < transport.policy.max_attempts,
+        )
+        if journal is not None:
+            journal.acknowledged(run_id, index, txn_ids, errors)
+        added_all.extend(added)
+        if not in_use:
+            return added_all
+        print(f"{len(in_use)} record(s) in use in QuickBooks; retrying")
+        transport.backoff(attempt - 1)
+        chunk = in_use
+        qbxml = build_deposit_add_batch(in_use, settings.bank_account, account_ids)
 
 
 def add_misc_income(
-    miscIncome: list[MiscIncome], settings: InputSettings
+    miscIncome: list[MiscIncome],
+    settings: InputSettings,
+    account_ids: Mapping[str, str] | None = None,
+    *,
+    journal: Journal | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    transport: QBTransport | None = None,
 ) -> list[MiscIncome]:
-    """Create multiple Misc Income in QuickBooks in a single batch request."""
+    """Create Misc Income in QuickBooks in batches of ``chunk_size``.
+
+    ``account_ids`` maps account full names to ``ListID`` so that known
+    accounts are referenced by ``ListID`` instead of by name. When a
+    ``journal`` is given, every chunk is recorded as intended before the
+    first one is sent, and as sent, acknowledged or failed as it progresses.
+
+    Transient QuickBooks failures are retried by ``transport``; a chunk that
+    still cannot be sent is recorded as failed and the run moves on, so a
+    later ``--resume`` sends only what is missing.
+    """
 
     if not miscIncome:
         return []  # Nothing to add; return early
 
-    # Build the QBXML with multiple DepositAddRq entries
-    requests = []  # Collect individual add requests to embed in one batch
-    for income in miscIncome:
-        try:
-            # Validate that the amount is numeric
-            miscAmount = float(income.amount)  # QuickBooks expects a numeric amount
-        except ValueError as exc:
-            raise ValueError(
-                f"amount must be numeric for QuickBooks payment terms: {income.amount}"
-            ) from exc
-
-        # Build the QBXML snippet for misc income addition
-        requests.append(
-            f"    <DepositAddRq>\n"
-            f"      <DepositAdd>\n"
-            f"        <DepositToAccountRef>\n"
-            f"          <FullName>{_escape_xml(str(settings.bank_account))}</FullName>\n"
-            f"        </DepositToAccountRef>\n"
-            f"        <DepositLineAdd>\n"
-            f"          <AccountRef>\n"
-            f"            <FullName>{_escape_xml(str(income.chart_of_account))}</FullName>\n"
-            f"          </AccountRef>\n"
-            f"          <Memo>{_escape_xml(str(income.record_id))}</Memo>\n"
-            f"          <Amount>{miscAmount:.2f}</Amount>\n"
-            f"        </DepositLineAdd>\n"
-            f"      </DepositAdd>\n"
-            f"    </DepositAddRq>"
+    run_id = ""
+    if journal is not None:
+        run_id = journal.start_run(
+            settings.bank_account,
+            (
+                miscIncome[i : i + chunk_size]
+                for i in range(0, len(miscIncome), chunk_size)
+            ),
         )
 
-    qbxml = (
-        '<?xml version="1.0"?>\n'
-        '<?qbxml version="13.0"?>\n'
-        "<QBXML>\n"
-        '  <QBXMLMsgsRq onError="continueOnError">\n' + "\n".join(requests) + "\n"
-        "  </QBXMLMsgsRq>\n"
-        "</QBXML>"
-    )  # Batch request enabling partial success on errors
-
+    deposit: List[MiscIncome] = []  # Deposits confirmed/returned by QuickBooks
+    next_chunk = 0  # First chunk not yet handed to QuickBooks
+    in_flight = False  # True between handing a chunk over and reading its reply
+    unsent = 0  # Chunks QuickBooks never processed
     try:
-        root = _send_qbxml(qbxml)  # Submit the batch to QuickBooks
-    except RuntimeError as exc:
-        # If the entire batch fails, return empty list
+        with transport or QBTransport(_qb_session, breaker=SHARED_BREAKER) as qb:
+            # Batch requests enabling partial success on errors
+            for index, (chunk, qbxml) in enumerate(
+                iter_deposit_add_batches(
+                    miscIncome, settings.bank_account, chunk_size, account_ids
+                )
+            ):
+                if journal is not None:
+                    journal.sent(run_id, index)
+                next_chunk, in_flight = index + 1, True
+                try:
+                    deposit.extend(
+                        _send_chunk(
+                            qb,
+                            chunk,
+                            qbxml,
+                            settings,
+                            account_ids,
+                            journal,
+                            run_id,
+                            index,
+                        )
+                    )
+                except TransientQBError as exc:
+                    # Not processed by QuickBooks, so safe to send again later
+                    if journal is not None:
+                        journal.failed(run_id, index, str(exc))
+                    unsent += 1
+                    print(f"Chunk {index} was not sent: {exc}")
+                except NotSentError:
+                    # Refused before reaching QuickBooks, so this chunk is
+                    # not in doubt; later chunks would be refused the same way
+                    next_chunk, in_flight = index, False
+                    raise
+                in_flight = False
+    except Exception as exc:
+        if journal is not None:
+            chunk_count = -(-len(miscIncome) // chunk_size)
+            for index in range(next_chunk, chunk_count):
+                journal.failed(run_id, index, str(exc))
+        if in_flight:
+            # QuickBooks may or may not have posted the chunk in flight;
+            # sending it again blindly could double-post deposits.
+            raise RuntimeError(
+                f"Batch add interrupted with a chunk in doubt ({exc}); "
+                "rerun with --resume to reconcile it"
+            ) from exc
         print(f"Batch add failed: {exc}")
-        return []
+    if unsent:
+        print(f"{unsent} chunk(s) could not be sent; rerun with --resume to send them")
 
-    # Parse all responses
-    deposit: List[MiscIncome] = []  # Deposits confirmed/returned by QuickBooks
-    for detail in root.findall(".//DepositQueryRs/DepositRet"):
-        amount = detail.findtext("DepositTotal")  # Extract the amount
-        memo = detail.findtext("DepositLineRet/Memo")  # Extract the memo
-        customer_name = detail.findtext(
-            "DepositLineRet/AccountRef/FullName"
-        )  # Extract and customer name
-        depositToAccount = detail.findtext(
-            "DepositToAccountRef/FullName"
-        )  # Extract and deposit account name
-        assert depositToAccount == settings.bank_account, (
-            f"DepositToAccount mismatch: expected {settings.bank_account}, got {depositToAccount}"
-        )
-        # assert customer_name == income.chart_of_account, f"Customer Name mismatch: expected {income.chart_of_account}, got {customer_name}"
-        deposit.append(
-            MiscIncome(
-                amount=float(amount) if amount else 0.0,
-                chart_of_account=str(customer_name),
-                record_id=str(memo),
-                source="quickbooks",
-            )
-        )
+    return deposit  # Return all deposits that were added/acknowledged
+
+
+def resume_misc_income(
+    settings: InputSettings,
+    journal: Journal,
+    account_ids: Mapping[str, str] | None = None,
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> list[MiscIncome]:
+    """Finish an interrupted run from the journal without double-posting.
 
-    return deposit  # Return all terms that were added/acknowledged
+    Records that were never sent are sent again. Records sent without an
+    answer are first looked up among deposits modified since they were sent;
+    those found are acknowledged in the journal and only the rest are sent.
+    """
 
+    pending = journal.pending()
+    if not pending:
+        return []
+    if pending.bank_account and pending.bank_account != settings.bank_account:
+        raise ValueError(
+            f"Journal was written for bank account {pending.bank_account}, "
+            f"not {settings.bank_account}"
+        )
+
+    remaining = list(pending.unsent)
+    reconciled: List[MiscIncome] = []
+    if pending.in_doubt:
+        sent_at = datetime.fromisoformat(pending.earliest_sent_at or iso_timestamp())
+        since = (sent_at - RECONCILE_MARGIN).isoformat(timespec="seconds")
+        existing = {
+            deposit.record_id: (txn_id, deposit)
+            for txn_id, deposit in fetch_deposits_modified_since(
+                settings.bank_account, since, account_ids
+            )
+        }
+        found: dict[str, str] = {}
+        for income in pending.in_doubt:
+            match = existing.get(income.record_id)
+            if match is None:
+                remaining.append(income)
+            else:
+                found[income.record_id] = match[0]
+                reconciled.append(match[1])
+        journal.reconciled(found, pending)
 
-def _escape_xml(value: str) -> str:
-    """Escape XML special characters for safe QBXML construction."""
-    return (
-        value.replace("&", "&amp;")
-        .replace("<", "&lt;")
-        .replace(">", "&gt;")
-        .replace('"', "&quot;")
-        .replace("'", "&apos;")
+    added = add_misc_income(
+        remaining, settings, account_ids, journal=journal, chunk_size=chunk_size
     )
+    return reconciled + added
 
 
 if __name__ == "__main__":
@@ -1,105 +1,264 @@
+import os
 import xml.etree.ElementTree as ET
-from src.models import MiscIncome
-from contextlib import contextmanager
-from typing import Iterator
+from src.models import MiscIncome, QBDeposit
+from src.qbxml import (
+    DEPOSIT_VERSION_ELEMENTS,
+    build_deposit_probe,
+    build_deposit_query,
+    build_account_query,
+    ref_element,
+)
+from src.qb_transport import SHARED_BREAKER, QBTransport
+from src.qb_transport import qb_session as _qb_session
+from src.validation import to_cents
+from typing import Iterator, Mapping, Sequence, cast
 
-try:
-    import win32com.client  # type: ignore
-except ImportError:  # pragma: no cover
-    win32com = None  # type: ignore
-
-APP_NAME = "Quickbooks Connector"  # do not chanege this
-
-
-def _require_win32com() -> None:
-    if win32com is None:  # pragma: no cover - exercised via tests
-        raise RuntimeError("pywin32 is required to communicate with QuickBooks")
+# Where each MiscIncome field is read from: the bank account from the
+# DepositRet, everything else from each of its DepositLineRet elements
+_DEPOSIT_FIELD_PATHS = {
+    "customer_name": "DepositToAccountRef/FullName",
+    "amount": "DepositLineRet/Amount",
+    "chart_of_account": "DepositLineRet/AccountRef/FullName",
+    "record_id": "DepositLineRet/Memo",
+    "txn_line_id": "DepositLineRet/TxnLineID",
+}
+_LINE_PATHS = {
+    name: path.partition("/")[2]
+    for name, path in _DEPOSIT_FIELD_PATHS.items()
+    if path.startswith("DepositLineRet/")
+}
+# Deposit queries ask QuickBooks for only these top-level elements, so
+# addresses, classes, custom fields and the like are never sent back.
+DEPOSIT_RET_ELEMENTS = tuple(
+    dict.fromkeys(
+        [
+            *DEPOSIT_VERSION_ELEMENTS,
+            *(path.split("/")[0] for path in _DEPOSIT_FIELD_PATHS.values()),
+        ]
+    )
+)
+# Characters of a response handed to the incremental parser at a time
+_FEED_SIZE = 1 << 16
 
 
-@contextmanager
-def _qb_session() -> Iterator[tuple[object, object]]:
-    _require_win32com()
-    session = win32com.client.Dispatch("QBXMLRP2.RequestProcessor")
-    session.OpenConnection2("", APP_NAME, 1)
-    ticket = session.BeginSession("", 0)
-    try:
-        yield session, ticket
-    finally:
-        try:
-            session.EndSession(ticket)
-        finally:
-            session.CloseConnection()
+def _process_request(qbxml: str) -> str:
+    # Queries are safe to repeat, so every transient failure is retried
+    with QBTransport(_qb_session, breaker=SHARED_BREAKER) as transport:
+        return transport.process(qbxml, idempotent=True)
 
 
 def _send_qbxml(qbxml: str) -> ET.Element:
-    with _qb_session() as (session, ticket):
-        print(f"Sending QBXML:\n{qbxml}")  # Debug output
-        raw_response = session.ProcessRequest(ticket, qbxml)  # type: ignore[attr-defined]
-        print(f"Received response:\n{raw_response}")  # Debug output
-    return _parse_response(raw_response)
+    return _parse_response(_process_request(qbxml))
 
 
-def _parse_response(raw_xml: str) -> ET.Element:
-    root = ET.fromstring(raw_xml)
-    response = root.find(".//*[@statusCode]")
-    if response is None:
-        raise RuntimeError("QuickBooks response missing status information")
-
+def _check_status(response: ET.Element) -> None:
     status_code = int(response.get("statusCode", "0"))
     status_message = response.get("statusMessage", "")
     # Status code 1 means "no matching objects found" - this is OK for queries
     if status_code != 0 and status_code != 1:
         print(f"QuickBooks error ({status_code}): {status_message}")
         raise RuntimeError(status_message)
+
+
+def _parse_response(raw_xml: str) -> ET.Element:
+    root = ET.fromstring(raw_xml)
+    # Responses are the direct children of QBXMLMsgsRs; not searching the
+    # whole tree keeps this cheap for large query results.
+    responses = root.findall("./QBXMLMsgsRs/*[@statusCode]")
+    if not responses:
+        raise RuntimeError("QuickBooks response missing status information")
+
+    # Every response of a multi-request message set must have succeeded
+    for response in responses:
+        _check_status(response)
     return root
 
 
-def fetch_deposit_lines(bank_account: str) -> list[MiscIncome]:
-    qbxml = (
-        '<?xml version="1.0"?>\n'
-        '<?qbxml version="16.0"?>\n'
-        "<QBXML>\n"
-        '  <QBXMLMsgsRq onError="stopOnError">\n'
-        "    <DepositQueryRq>\n"
-        "      <IncludeLineItems >true</IncludeLineItems >\n"
-        "    </DepositQueryRq>\n"
-        "  </QBXMLMsgsRq>\n"
-        "</QBXML>"
+def _bank_ref(bank_account: str, account_ids: Mapping[str, str] | None) -> str | None:
+    if account_ids and bank_account in account_ids:
+        return ref_element(bank_account, account_ids)
+    return None
+
+
+def _deposit_query(
+    bank_account: str,
+    account_ids: Mapping[str, str] | None,
+    modified_since: str | None = None,
+) -> str:
+    return build_deposit_query(
+        _bank_ref(bank_account, account_ids),
+        modified_since,
+        include=DEPOSIT_RET_ELEMENTS,
     )
-    root = _send_qbxml(qbxml)
-    deposit: list[MiscIncome] = []
-    for detail in root.findall(".//DepositQueryRs/DepositRet"):
-        amount = detail.findtext("DepositTotal") or "0.0"
-        deposit_to_account = detail.findtext("DepositToAccountRef/FullName") or ""
-        customer_name = detail.findtext("DepositLineRet/AccountRef/FullName") or ""
-        memo = detail.findtext("DepositLineRet/Memo") or ""
+
+
+def _iter_deposits(raw_xml: str) -> Iterator[tuple[str, MiscIncome]]:
+    """Yield ``(TxnID, deposit line)`` for every line in a response."""
+
+    for deposit in _iter_qb_deposits(raw_xml):
+        for misc_income in deposit.lines:
+            yield deposit.txn_id, misc_income
+
+
+def _deposit_from_element(detail: ET.Element) -> QBDeposit:
+    deposit_to_account = detail.findtext(_DEPOSIT_FIELD_PATHS["customer_name"]) or ""
+    lines: list[MiscIncome] = []
+    for line in detail.iterfind("DepositLineRet"):
+        text = line.findtext(_LINE_PATHS["amount"]) or "0.0"
         try:
-            misc_income = MiscIncome(
-                amount=float(amount),
-                customer_name=deposit_to_account,
-                chart_of_account=customer_name,
-                record_id=memo,
-                source="quickbooks",
-            )
+            amount = float(text)
+            cents = to_cents(text)
         except ValueError:
             # Skip if amount cannot be converted to float
             continue
-        deposit.append(misc_income)
-    return deposit
-
-
-def _escape_xml(value: str) -> str:
-    """Escape XML special characters for safe QBXML construction."""
-    return (
-        value.replace("&", "&amp;")
-        .replace("<", "&lt;")
-        .replace(">", "&gt;")
-        .replace('"', "&quot;")
-        .replace("'", "&apos;")
+        lines.append(
+            MiscIncome(
+                amount=amount,
+                customer_name=deposit_to_account,
+                chart_of_account=line.findtext(_LINE_PATHS["chart_of_account"]) or "",
+                record_id=line.findtext(_LINE_PATHS["record_id"]) or "",
+                source="quickbooks",
+                txn_line_id=line.findtext(_LINE_PATHS["txn_line_id"]) or None,
+                cents=cents,
+            )
+        )
+    return QBDeposit(
+        txn_id=detail.findtext("TxnID") or "",
+        edit_sequence=detail.findtext("EditSequence") or "",
+        time_modified=detail.findtext("TimeModified") or "",
+        lines=lines,
     )
 
 
-__all__ = ["fetch_deposit_lines", "MiscIncome"]
+def _iter_qb_deposits(raw_xml: str) -> Iterator[QBDeposit]:
+    """Yield every ``DepositRet`` in a response with one record per line.
+
+    The response is parsed incrementally and each ``DepositRet`` is dropped
+    once read, so the full element tree is never built.
+    """
+
+    parser: ET.XMLPullParser = ET.XMLPullParser(events=("end",))
+    has_status = False
+    for offset in range(0, len(raw_xml), _FEED_SIZE):
+        parser.feed(raw_xml[offset : offset + _FEED_SIZE])
+        # Only "end" events are requested, and they always carry an element
+        events = cast(Iterator[tuple[str, ET.Element]], parser.read_events())
+        for _, element in events:
+            if element.tag == "DepositRet":
+                yield _deposit_from_element(element)
+                element.clear()
+            elif "statusCode" in element.attrib:
+                _check_status(element)
+                has_status = True
+    parser.close()
+    if not has_status:
+        raise RuntimeError("QuickBooks response missing status information")
+
+
+def fetch_deposit_lines(
+    bank_account: str, account_ids: Mapping[str, str] | None = None
+) -> list[MiscIncome]:
+    """Return deposit lines from QuickBooks, one record per ``DepositLineRet``.
+
+    When ``account_ids`` resolves ``bank_account`` to a ``ListID``, only
+    deposits into that account are requested.
+    """
+
+    raw_xml = _process_request(_deposit_query(bank_account, account_ids))
+    return [misc_income for _, misc_income in _iter_deposits(raw_xml)]
+
+
+def fetch_deposits_modified_since(
+    bank_account: str, since: str, account_ids: Mapping[str, str] | None = None
+) -> list[tuple[str, MiscIncome]]:
+    """Return ``(TxnID, line)`` pairs for deposits modified since ``since``."""
+
+    raw_xml = _process_request(_deposit_query(bank_account, account_ids, since))
+    return list(_iter_deposits(raw_xml))
+
+
+def fetch_deposits(
+    bank_account: str,
+    account_ids: Mapping[str, str] | None = None,
+    txn_ids: Sequence[str] | None = None,
+) -> list[QBDeposit]:
+    """Return deposits with their ``TxnID``, ``EditSequence`` and ``TimeModified``.
+
+    Without ``txn_ids`` every deposit into ``bank_account`` is returned, as by
+    :func:`fetch_deposit_lines`; with them, exactly those deposits are.
+    """
+
+    if txn_ids:
+        query = build_deposit_query(txn_ids=txn_ids, include=DEPOSIT_RET_ELEMENTS)
+    else:
+        query = _deposit_query(bank_account, account_ids)
+    return list(_iter_qb_deposits(_process_request(query)))
+
+
+def probe_deposit_changes(
+    bank_account: str, since: str, account_ids: Mapping[str, str] | None = None
+) -> tuple[dict[str, tuple[str, str]], list[str]]:
+    """Return which deposits changed since ``since`` without their bodies.
+
+    The result is ``(modified, deleted)``: ``modified`` maps the TxnID of each
+    deposit modified since then to its ``(EditSequence, TimeModified)`` and
+    ``deleted`` lists the TxnIDs of deposits deleted since then.
+    """
+
+    root = _send_qbxml(build_deposit_probe(since, _bank_ref(bank_account, account_ids)))
+    modified = {
+        ret.findtext("TxnID") or "": (
+            ret.findtext("EditSequence") or "",
+            ret.findtext("TimeModified") or "",
+        )
+        for ret in root.findall(".//DepositQueryRs/DepositRet")
+    }
+    deleted = [
+        ret.findtext("TxnID") or ""
+        for ret in root.findall(".//TxnDeletedQueryRs/TxnDeletedRet")
+    ]
+    return modified, deleted
+
+
+def fetch_accounts() -> dict[str, str]:
+    """Return active accounts as a full name to ``ListID`` map."""
+
+    root = _send_qbxml(build_account_query())
+    accounts: dict[str, str] = {}
+    for ret in root.findall(".//AccountQueryRs/AccountRet"):
+        name = ret.findtext("FullName")
+        list_id = ret.findtext("ListID")
+        if name and list_id:
+            accounts[name] = list_id
+    return accounts
+
+
+def fetch_company_marker() -> str:
+    """Return a marker that changes whenever the open company file is saved.
+
+    The marker is the company file path plus its last-modified time; only the
+    path is used if the file cannot be stat'ed (e.g. it lives on a server).
+    """
+
+    with _qb_session() as (session, ticket):
+        company_file = session.GetCurrentCompanyFileName(ticket)  # type: ignore[attr-defined]
+    try:
+        modified = os.stat(company_file).st_mtime_ns
+    except OSError:
+        return str(company_file)
+    return f"{company_file}|{modified}"
+
+
+__all__ = [
+    "fetch_deposit_lines",
+    "fetch_deposits_modified_since",
+    "fetch_deposits",
+    "probe_deposit_changes",
+    "DEPOSIT_RET_ELEMENTS",
+    "fetch_accounts",
+    "fetch_company_marker",
+    "MiscIncome",
+]
 
 if __name__ == "__main__":
     # Example usage: pass a bank account name
@@ -0,0 +1,304 @@
+"""Sending QBXML to QuickBooks with retries and a circuit breaker.
+
+QuickBooks and the COM layer in front of it fail transiently under load: the
+company file is locked by another user, QuickBooks is still starting or
+showing a dialog, or the RPC call is rejected. :class:`QBTransport` retries
+such failures with exponential backoff and full jitter, reopening the
+session in between, and stops trying once a :class:`CircuitBreaker` has
+seen too many failures in a row.
+
+Failures are classified before they are retried:
+
+* ``not_processed`` - QuickBooks certainly did not run the request (the
+  session could not be opened, or the call was rejected); always retried;
+* ``ambiguous`` - the connection failed mid-call, so the request may have
+  run; retried only for idempotent requests such as queries;
+* ``fatal`` - anything else; raised immediately, as :class:`NotSentError`
+  if it happened before the request was handed to QuickBooks.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, ContextManager, Iterator, Literal
+
+try:
+    import win32com.client  # type: ignore
+except ImportError:  # pragma: no cover
+    win32com = None  # type: ignore
+
+APP_NAME = "Quickbooks Connector"  # do not chanege this
+
+logger = logging.getLogger(__name__)
+
+FailureKind = Literal["not_processed", "ambiguous", "fatal"]
+
+# HRESULTs meaning the request never reached QuickBooks
+_NOT_PROCESSED_HRESULTS = frozenset(
+    {
+        0x80010001,  # RPC_E_CALL_REJECTED
+        0x8001010A,  # RPC_E_SERVERCALL_RETRYLATER
+        0x80040408,  # QuickBooks could not be started
+        0x80040422,  # Another application holds the file in single-user mode
+        0x80040424,  # QuickBooks did not finish its initialisation
+    }
+)
+# HRESULTs meaning the connection dropped while a request may have been running
+_AMBIGUOUS_HRESULTS = frozenset(
+    {
+        0x80010108,  # RPC_E_DISCONNECTED
+        0x800706BA,  # RPC_S_SERVER_UNAVAILABLE
+        0x800706BE,  # RPC_S_CALL_FAILED
+        0x80010105,  # RPC_E_SERVERFAULT
+    }
+)
+# qbXML statuses of a single request that was not saved because a record or
+# list was in use, or because an earlier request in the set stopped it. 3180
+# ("error when saving") is left out: it mostly reports bad data, which
+# resending cannot fix.
+RETRYABLE_STATUS_CODES = frozenset({3175, 3176, 3231})
+
+
+def _require_win32com() -> None:
+    if win32com is None:  # pragma: no cover - exercised via tests
+        raise RuntimeError("pywin32 is required to communicate with QuickBooks")
+
+
+@contextmanager
+def qb_session() -> Iterator[tuple[object, object]]:
+    """Open a QuickBooks connection and session, closing both on exit."""
+
+    _require_win32com()
+    session = win32com.client.Dispatch("QBXMLRP2.RequestProcessor")
+    session.OpenConnection2("", APP_NAME, 1)
+    ticket = session.BeginSession("", 0)
+    try:
+        yield session, ticket
+    finally:
+        try:
+            session.EndSession(ticket)
+        finally:
+            session.CloseConnection()
+
+
+class NotSentError(RuntimeError):
+    """A request never reached QuickBooks, so it is safe to send again."""
+
+
+class TransientQBError(NotSentError):
+    """QuickBooks did not process a request and retrying did not help."""
+
+
+class CircuitOpenError(TransientQBError):
+    """Too many consecutive failures; requests are not being sent."""
+
+
+def _hresults(exc: BaseException) -> set[int]:
+    """Return the HRESULT and COM scode carried by a ``com_error``, if any."""
+
+    codes: set[int] = set()
+    args: tuple[Any, ...] = getattr(exc, "args", ())
+    candidates = [getattr(exc, "hresult", None), args[0] if args else None]
+    if len(args) > 2 and isinstance(args[2], tuple) and len(args[2]) > 5:
+        candidates.append(args[2][5])  # excepinfo scode
+    for code in candidates:
+        if isinstance(code, int) and not isinstance(code, bool):
+            codes.add(code & 0xFFFFFFFF)
+    return codes
+
+
+def classify_error(exc: BaseException) -> FailureKind:
+    """Classify an exception raised while talking to QuickBooks."""
+
+    codes = _hresults(exc)
+    if codes & _NOT_PROCESSED_HRESULTS:
+        return "not_processed"
+    if codes & _AMBIGUOUS_HRESULTS:
+        return "ambiguous"
+    return "fatal"
+
+
+def is_retryable_status(status_code: int) -> bool:
+    """Return True if a request failing with ``status_code`` may be resent."""
+
+    return status_code in RETRYABLE_STATUS_CODES
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    max_attempts: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int, rng: random.Random) -> float:
+        """Return the pause before retry ``attempt`` (0-based), with full jitter."""
+
+        return rng.uniform(0.0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+class CircuitBreaker:
+    """Stops requests after ``failure_threshold`` consecutive failures.
+
+    Once open, requests fail fast until ``reset_timeout`` seconds have passed;
+    the next request is then let through, and its outcome closes or reopens
+    the circuit.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 8,
+        reset_timeout: float = 60.0,
+        *,
+        now: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._now = now
+        self.failures = 0
+        self.opened_at: float | None = None
+
+    def allow(self) -> None:
+        """Raise :class:`CircuitOpenError` if requests are not being sent."""
+
+        if self.opened_at is not None:
+            if self._now() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError(
+                    f"QuickBooks failed {self.failures} times in a row; "
+                    "not sending further requests"
+                )
+            self.opened_at = None  # Half-open: let one request through
+            self.failures = self.failure_threshold - 1
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = self._now()
+
+
+# Shared by the reader and the adder, so every request of a process counts
+# towards the same consecutive failures; a breaker per transport would never
+# open for one-shot queries, which give up after ``max_attempts``.
+SHARED_BREAKER = CircuitBreaker()
+
+
+class QBTransport:
+    """Sends QBXML over one reusable session, retrying transient failures."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], ContextManager[tuple[Any, Any]]] = qb_session,
+        *,
+        policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        breaker: CircuitBreaker | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: random.Random | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.policy = policy
+        self.breaker = breaker or CircuitBreaker()
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._stack: ExitStack | None = None
+        self._session: tuple[Any, Any] | None = None
+
+    def __enter__(self) -> QBTransport:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """End the session, if one is open."""
+
+        stack, self._stack, self._session = self._stack, None, None
+        if stack is not None:
+            try:
+                stack.close()
+            except Exception:  # noqa: BLE001 - the session is already broken
+                pass
+
+    def backoff(self, attempt: int) -> None:
+        """Sleep before retry ``attempt`` (0-based)."""
+
+        self._sleep(self.policy.delay(attempt, self._rng))
+
+    def _open(self) -> tuple[Any, Any]:
+        if self._session is None:
+            stack = ExitStack()
+            self._session = stack.enter_context(self.session_factory())
+            self._stack = stack
+        return self._session
+
+    def process(self, qbxml: str, *, idempotent: bool) -> str:
+        """Send ``qbxml`` and return the raw response.
+
+        Requests QuickBooks did not process are retried up to
+        ``policy.max_attempts`` times; if they still fail
+        :class:`TransientQBError` is raised. Ambiguous failures are retried
+        only when ``idempotent``; otherwise the original exception is raised,
+        since QuickBooks may have run the request.
+        """
+
+        attempt = 0
+        while True:
+            self.breaker.allow()
+            sent = False
+            try:
+                session, ticket = self._open()
+                # Requests and responses run to megabytes, so they are only
+                # formatted when debug logging is switched on
+                logger.debug("Sending QBXML:\n%s", qbxml)
+                sent = True
+                raw_response = session.ProcessRequest(ticket, qbxml)
+                logger.debug("Received response:\n%s", raw_response)
+            except Exception as exc:
+                self.close()
+                kind = classify_error(exc)
+                if kind == "fatal" and not sent:
+                    # e.g. the application is not authorised for the file
+                    raise NotSentError(
+                        f"Could not send the request to QuickBooks: {exc}"
+                    ) from exc
+                # A dropped connection before anything was sent is harmless
+                if kind == "fatal" or (kind == "ambiguous" and sent and not idempotent):
+                    raise
+                self.breaker.record_failure()
+                attempt += 1
+                if attempt >= self.policy.max_attempts:
+                    raise TransientQBError(
+                        f"QuickBooks did not process the request after "
+                        f"{attempt} attempts: {exc}"
+                    ) from exc
+                logger.warning("QuickBooks unavailable (%s); retrying", exc)
+                self.backoff(attempt - 1)
+                continue
+            self.breaker.record_success()
+            return raw_response
+
+
+__all__ = [
+    "APP_NAME",
+    "qb_session",
+    "QBTransport",
+    "RetryPolicy",
+    "CircuitBreaker",
+    "NotSentError",
+    "TransientQBError",
+    "CircuitOpenError",
+    "classify_error",
+    "is_retryable_status",
+    "DEFAULT_RETRY_POLICY",
+    "SHARED_BREAKER",
+    "RETRYABLE_STATUS_CODES",
+]
@@ -0,0 +1,288 @@
+"""Shared QBXML request builders.
+
+Request templates are compiled once at import time. Field values are escaped
+in a single ``str.translate`` pass, and only when they actually contain an XML
+special character. Batches are streamed into a text buffer instead of being
+assembled from a list of per-row strings.
+"""
+
+from __future__ import annotations
+
+import io
+import re
+from functools import lru_cache
+from typing import Iterable, Iterator, Mapping, Sequence, TextIO
+
+from src.models import MiscIncome
+
+QBXML_ADD_VERSION = "13.0"
+QBXML_QUERY_VERSION = "16.0"
+
+_XML_ESCAPES = str.maketrans(
+    {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&apos;"}
+)
+_needs_escape = re.compile(r"[&<>\"']").search
+
+_ENVELOPE_HEAD = (
+    '<?xml version="1.0"?>\n'
+    '<?qbxml version="{version}"?>\n'
+    "<QBXML>\n"
+    '  <QBXMLMsgsRq onError="{on_error}">\n'
+)
+_ENVELOPE_TAIL = "  </QBXMLMsgsRq>\n</QBXML>"
+
+# ``{bank_ref}`` and ``{tag}`` are bound once per batch; the ``%`` fields are
+# filled per row.
+_DEPOSIT_ADD_RQ = (
+    "    <DepositAddRq>\n"
+    "      <DepositAdd>\n"
+    "        <DepositToAccountRef>\n"
+    "          {bank_ref}\n"
+    "        </DepositToAccountRef>\n"
+    "        <DepositLineAdd>\n"
+    "          <AccountRef>\n"
+    "            <{tag}>%s</{tag}>\n"
+    "          </AccountRef>\n"
+    "          <Memo>%s</Memo>\n"
+    "          <Amount>%.2f</Amount>\n"
+    "        </DepositLineAdd>\n"
+    "      </DepositAdd>\n"
+    "    </DepositAddRq>\n"
+)
+
+_DEPOSIT_QUERY_RQ = "    <DepositQueryRq>\n{filters}{include}    </DepositQueryRq>\n"
+_INCLUDE_LINE_ITEMS = "      <IncludeLineItems >true</IncludeLineItems >\n"
+# The elements of a DepositRet that identify a version of a deposit
+DEPOSIT_VERSION_ELEMENTS = ("TxnID", "EditSequence", "TimeModified")
+_INCLUDE_RET_ELEMENT = "      <IncludeRetElement>{name}</IncludeRetElement>\n"
+_TXN_ID_FILTER = "      <TxnID>{txn_id}</TxnID>\n"
+_DELETED_DEPOSITS_RQ = (
+    "    <TxnDeletedQueryRq>\n"
+    "      <TxnDelType>Deposit</TxnDelType>\n"
+    "      <DeletedDateRangeFilter>\n"
+    "        <FromDeletedDate>{since}</FromDeletedDate>\n"
+    "      </DeletedDateRangeFilter>\n"
+    "    </TxnDeletedQueryRq>\n"
+)
+_MODIFIED_FILTER = (
+    "      <ModifiedDateRangeFilter>\n"
+    "        <FromModifiedDate>{since}</FromModifiedDate>\n"
+    "      </ModifiedDateRangeFilter>\n"
+)
+_ACCOUNT_FILTER = "      <AccountFilter>\n        {ref}\n      </AccountFilter>\n"
+
+_ACCOUNT_QUERY_RQ = (
+    "    <AccountQueryRq>\n"
+    "      <IncludeRetElement>ListID</IncludeRetElement>\n"
+    "      <IncludeRetElement>FullName</IncludeRetElement>\n"
+    "    </AccountQueryRq>\n"
+)
+
+
+def escape_xml(value: object) -> str:
+    """Escape XML special characters for safe QBXML construction."""
+
+    text = value if isinstance(value, str) else str(value)
+    if _needs_escape(text) is None:
+        return text
+    return text.translate(_XML_ESCAPES)
+
+
+def envelope_head(version: str, on_error: str) -> str:
+    """Return the QBXML prolog and opening ``QBXMLMsgsRq`` tag."""
+
+    return _ENVELOPE_HEAD.format(version=version, on_error=on_error)
+
+
+def _ref(name: str, list_ids: Mapping[str, str] | None) -> tuple[str, str]:
+    """Return the ``(tag, escaped value)`` used to reference a list entity.
+
+    A ``ListID`` is preferred when ``list_ids`` knows the name, since it
+    survives renames and saves QuickBooks a name lookup.
+    """
+
+    list_id = list_ids.get(name) if list_ids else None
+    if list_id:
+        return "ListID", escape_xml(list_id)
+    return "FullName", escape_xml(name)
+
+
+def ref_element(name: str, list_ids: Mapping[str, str] | None = None) -> str:
+    """Return a ``<ListID>`` or ``<FullName>`` element referencing ``name``."""
+
+    tag, value = _ref(name, list_ids)
+    return f"<{tag}>{value}</{tag}>"
+
+
+@lru_cache(maxsize=8)
+def _deposit_add_template(bank_ref: str, tag: str) -> str:
+    """Return the ``DepositAddRq`` template with the bank reference bound in."""
+
+    return _DEPOSIT_ADD_RQ.format(bank_ref=bank_ref.replace("%", "%%"), tag=tag)
+
+
+def iter_deposit_add_rq(
+    incomes: Iterable[MiscIncome],
+    bank_account: str,
+    account_ids: Mapping[str, str] | None = None,
+) -> Iterator[str]:
+    """Yield one rendered, newline-terminated ``DepositAddRq`` per income.
+
+    ``account_ids`` maps account full names to ``ListID``; accounts it knows
+    are sent by ``ListID``, all others by ``FullName``.
+    """
+
+    bank_ref = ref_element(str(bank_account), account_ids)
+    # Chart-of-account names repeat heavily, so resolve each distinct one once.
+    accounts: dict[str, tuple[str, str]] = {}
+    for income in incomes:
+        try:
+            amount = float(income.amount)  # QuickBooks expects a numeric amount
+        except (TypeError, ValueError) as exc:
+            raise ValueError(
+                f"amount must be numeric for QuickBooks deposits: {income.amount}"
+            ) from exc
+        resolved = accounts.get(income.chart_of_account)
+        if resolved is None:
+            tag, value = _ref(str(income.chart_of_account), account_ids)
+            resolved = accounts[income.chart_of_account] = (
+                _deposit_add_template(bank_ref, tag),
+                value,
+            )
+        template, account = resolved
+        yield template % (account, escape_xml(income.record_id), amount)
+
+
+def write_deposit_add_batch(
+    incomes: Iterable[MiscIncome],
+    bank_account: str,
+    out: TextIO,
+    account_ids: Mapping[str, str] | None = None,
+) -> None:
+    """Stream a complete ``DepositAddRq`` batch document into ``out``."""
+
+    write = out.write
+    write(envelope_head(QBXML_ADD_VERSION, "continueOnError"))
+    for request in iter_deposit_add_rq(incomes, bank_account, account_ids):
+        write(request)
+    write(_ENVELOPE_TAIL)
+
+
+def build_deposit_add_batch(
+    incomes: Iterable[MiscIncome],
+    bank_account: str,
+    account_ids: Mapping[str, str] | None = None,
+) -> str:
+    """Return a complete ``DepositAddRq`` batch document as a string."""
+
+    buffer = io.StringIO()
+    write_deposit_add_batch(incomes, bank_account, buffer, account_ids)
+    return buffer.getvalue()
+
+
+def iter_deposit_add_batches(
+    incomes: Iterable[MiscIncome],
+    bank_account: str,
+    chunk_size: int,
+    account_ids: Mapping[str, str] | None = None,
+) -> Iterator[tuple[list[MiscIncome], str]]:
+    """Yield ``(chunk, qbxml)`` pairs of at most ``chunk_size`` incomes each."""
+
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive: {chunk_size}")
+    chunk: list[MiscIncome] = []
+    for income in incomes:
+        chunk.append(income)
+        if len(chunk) >= chunk_size:
+            yield chunk, build_deposit_add_batch(chunk, bank_account, account_ids)
+            chunk = []
+    if chunk:
+        yield chunk, build_deposit_add_batch(chunk, bank_account, account_ids)
+
+
+def _include_ret_elements(names: Iterable[str]) -> str:
+    return "".join(_INCLUDE_RET_ELEMENT.format(name=name) for name in names)
+
+
+def build_deposit_query(
+    account_ref: str | None = None,
+    modified_since: str | None = None,
+    txn_ids: Sequence[str] | None = None,
+    include: Sequence[str] | None = None,
+) -> str:
+    """Return the ``DepositQueryRq`` document used to read deposits.
+
+    ``account_ref`` is an element from :func:`ref_element`; when given, only
+    deposits touching that account are returned. ``modified_since`` is an
+    ISO-8601 timestamp limiting the query to recently modified deposits.
+    ``txn_ids`` fetches exactly those deposits; QuickBooks does not allow it
+    to be combined with the other filters. ``include`` names the top-level
+    ``DepositRet`` elements to return; all of them are returned when omitted.
+    """
+
+    if txn_ids:
+        if account_ref or modified_since:
+            raise ValueError("txn_ids cannot be combined with other deposit filters")
+        filters = "".join(
+            _TXN_ID_FILTER.format(txn_id=escape_xml(txn_id)) for txn_id in txn_ids
+        )
+    else:
+        filters = ""
+        if modified_since:
+            filters += _MODIFIED_FILTER.format(since=escape_xml(modified_since))
+        if account_ref:
+            filters += _ACCOUNT_FILTER.format(ref=account_ref)
+    return (
+        envelope_head(QBXML_QUERY_VERSION, "stopOnError")
+        + _DEPOSIT_QUERY_RQ.format(
+            filters=filters,
+            include=_INCLUDE_LINE_ITEMS + _include_ret_elements(include or ()),
+        )
+        + _ENVELOPE_TAIL
+    )
+
+
+def build_deposit_probe(modified_since: str, account_ref: str | None = None) -> str:
+    """Return a cheap query listing which deposits changed since a time.
+
+    Only ``TxnID``, ``EditSequence`` and ``TimeModified`` are returned for
+    deposits modified since ``modified_since``, and a ``TxnDeletedQueryRq``
+    in the same message set lists deposits deleted since then.
+    """
+
+    since = escape_xml(modified_since)
+    filters = _MODIFIED_FILTER.format(since=since)
+    if account_ref:
+        filters += _ACCOUNT_FILTER.format(ref=account_ref)
+    include = _include_ret_elements(DEPOSIT_VERSION_ELEMENTS)
+    return (
+        envelope_head(QBXML_QUERY_VERSION, "stopOnError")
+        + _DEPOSIT_QUERY_RQ.format(filters=filters, include=include)
+        + _DELETED_DEPOSITS_RQ.format(since=since)
+        + _ENVELOPE_TAIL
+    )
+
+
+def build_account_query() -> str:
+    """Return a document listing the ``ListID`` and name of active accounts."""
+
+    return (
+        envelope_head(QBXML_QUERY_VERSION, "stopOnError")
+        + _ACCOUNT_QUERY_RQ
+        + _ENVELOPE_TAIL
+    )
+
+
+__all__ = [
+    "escape_xml",
+    "envelope_head",
+    "iter_deposit_add_rq",
+    "write_deposit_add_batch",
+    "build_deposit_add_batch",
+    "iter_deposit_add_batches",
+    "build_deposit_query",
+    "build_deposit_probe",
+    "DEPOSIT_VERSION_ELEMENTS",
+    "build_account_query",
+    "ref_element",
+]
@@ -0,0 +1,102 @@
+"""Locally cached QuickBooks reference data.
+
+The account list is fetched from QuickBooks once and persisted as JSON
+together with the time it was fetched and a marker for the company file it
+came from. Later runs reuse the cached list until the TTL expires
+or the company file changes, and resolve names to ``ListID`` in O(1).
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from src.persistence import read_json, write_json
+from src.qb_reader import fetch_accounts, fetch_company_marker
+
+DEFAULT_CACHE_PATH = Path(".qb_reference_cache.json")
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+_CACHE_VERSION = 2
+
+
+@dataclass(slots=True)
+class ReferenceData:
+    accounts: dict[str, str] = field(default_factory=dict)
+    company_marker: str = ""
+    fetched_at: float = 0.0
+
+    def account_id(self, name: str) -> str | None:
+        """Return the ``ListID`` of the active account called ``name``."""
+
+        return self.accounts.get(name)
+
+    def is_fresh(self, company_marker: str, ttl: float, now: float) -> bool:
+        """Return True if this data may be reused for ``company_marker``."""
+
+        return self.company_marker == company_marker and now - self.fetched_at < ttl
+
+
+def _read_cache(path: Path) -> ReferenceData | None:
+    data = read_json(path, _CACHE_VERSION)
+    if data is None:
+        return None
+    return ReferenceData(
+        accounts=dict(data.get("accounts") or {}),
+        company_marker=str(data.get("company_marker") or ""),
+        fetched_at=float(data.get("fetched_at") or 0.0),
+    )
+
+
+def _write_cache(path: Path, data: ReferenceData) -> None:
+    write_json(
+        path,
+        {
+            "version": _CACHE_VERSION,
+            "company_marker": data.company_marker,
+            "fetched_at": data.fetched_at,
+            "accounts": data.accounts,
+        },
+    )
+
+
+def load_reference_data(
+    path: Path = DEFAULT_CACHE_PATH,
+    *,
+    ttl: float = DEFAULT_TTL_SECONDS,
+    refresh: bool = False,
+    fetch_accounts: Callable[[], dict[str, str]] = fetch_accounts,
+    fetch_marker: Callable[[], str] = fetch_company_marker,
+    now: Callable[[], float] = time.time,
+) -> ReferenceData:
+    """Return the account list, querying QuickBooks only if needed.
+
+    The cache at ``path`` is reused when it is younger than ``ttl`` seconds
+    and was built from the currently open company file. Otherwise the lists
+    is fetched again and the cache is rewritten.
+    """
+
+    path = Path(path)
+    marker = fetch_marker()
+    current = now()
+    if not refresh:
+        cached = _read_cache(path)
+        if cached is not None and cached.is_fresh(marker, ttl, current):
+            return cached
+
+    data = ReferenceData(
+        accounts=fetch_accounts(),
+        company_marker=marker,
+        fetched_at=current,
+    )
+    _write_cache(path, data)
+    return data
+
+
+__all__ = [
+    "ReferenceData",
+    "load_reference_data",
+    "DEFAULT_CACHE_PATH",
+    "DEFAULT_TTL_SECONDS",
+]
@@ -0,0 +1,186 @@
+"""Queryable SQLite copy of the sync report.
+
+The JSON report holds every conflict in one list, which is impractical to
+search once there are tens of thousands of them. :class:`ReportDatabase`
+writes the same rows to a SQLite file as the run produces them, in batches,
+with indexes on record id, account, reason and amount delta, and two views
+summarising each run by reason and by account::
+
+    SELECT * FROM reason_summary WHERE run_id = ?;
+    SELECT * FROM report_rows WHERE account = 'Rental' ORDER BY amount_delta;
+
+Each run adds its rows under a new ``run_id``; earlier runs are kept.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import uuid
+from itertools import islice
+from pathlib import Path
+from typing import Any, Iterable, Literal, Mapping
+
+from src.reporting import iso_timestamp
+
+DEFAULT_BATCH_SIZE = 5000
+RowKind = Literal["conflict", "rejected", "added", "planned"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    generated_at TEXT NOT NULL,
+    finished_at TEXT,
+    status TEXT,
+    error TEXT,
+    same_misc_income INTEGER
+);
+CREATE TABLE IF NOT EXISTS report_rows (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    kind TEXT NOT NULL,
+    record_id TEXT,
+    reason TEXT NOT NULL,
+    account TEXT,
+    qb_account TEXT,
+    excel_account TEXT,
+    qb_amount REAL,
+    excel_amount REAL,
+    amount_delta REAL
+);
+CREATE INDEX IF NOT EXISTS report_rows_record_id ON report_rows(run_id, record_id);
+CREATE INDEX IF NOT EXISTS report_rows_account ON report_rows(run_id, account);
+CREATE INDEX IF NOT EXISTS report_rows_reason ON report_rows(run_id, reason);
+CREATE INDEX IF NOT EXISTS report_rows_delta ON report_rows(run_id, amount_delta);
+CREATE VIEW IF NOT EXISTS reason_summary AS
+    SELECT run_id, kind, reason, COUNT(*) AS row_count,
+           SUM(amount_delta) AS amount_delta
+    FROM report_rows GROUP BY run_id, kind, reason;
+CREATE VIEW IF NOT EXISTS account_summary AS
+    SELECT run_id, kind, account, COUNT(*) AS row_count,
+           SUM(amount_delta) AS amount_delta
+    FROM report_rows GROUP BY run_id, kind, account;
+"""
+
+_INSERT_ROW = (
+    "INSERT INTO report_rows (run_id, kind, record_id, reason, account, "
+    "qb_account, excel_account, qb_amount, excel_amount, amount_delta) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def _number(value: object) -> float | None:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def _row(run_id: str, kind: RowKind, item: Mapping[str, Any]) -> tuple[Any, ...]:
+    """Flatten a report dict (conflict, rejected row or record) into a row.
+
+    ``amount_delta`` is the Excel amount minus the QuickBooks amount, with a
+    missing side counted as zero; it is NULL when neither amount is numeric.
+    """
+
+    qb_account = item.get("qb_chart_of_account")
+    excel_account = item.get("excel_chart_of_account", item.get("chart_of_account"))
+    qb_amount = _number(item.get("qb_amount"))
+    excel_amount = _number(item.get("excel_amount", item.get("amount")))
+    delta = None
+    if qb_amount is not None or excel_amount is not None:
+        delta = round((excel_amount or 0.0) - (qb_amount or 0.0), 2)
+    return (
+        run_id,
+        kind,
+        None if item.get("record_id") is None else str(item["record_id"]),
+        item.get("reason") or kind,
+        excel_account or qb_account,
+        qb_account,
+        excel_account,
+        qb_amount,
+        excel_amount,
+        delta,
+    )
+
+
+class ReportDatabase:
+    """Report rows of one run, written to a SQLite file in batches."""
+
+    def __init__(
+        self,
+        path: Path,
+        generated_at: str | None = None,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.run_id = uuid.uuid4().hex
+        self._connection = sqlite3.connect(self.path)
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+            self._connection.execute(
+                "INSERT INTO runs (run_id, generated_at) VALUES (?, ?)",
+                (self.run_id, generated_at or iso_timestamp()),
+            )
+
+    def write(self, kind: RowKind, items: Iterable[Mapping[str, Any]]) -> int:
+        """Append report dicts as rows of ``kind``; return how many were written.
+
+        Rows are committed every ``batch_size`` rows, so a large report never
+        sits in one transaction and is visible while the run continues.
+        """
+
+        rows = (_row(self.run_id, kind, item) for item in items)
+        written = 0
+        while batch := list(islice(rows, self.batch_size)):
+            with self._connection:
+                self._connection.executemany(_INSERT_ROW, batch)
+            written += len(batch)
+        return written
+
+    def finish(self, payload: Mapping[str, Any]) -> None:
+        """Record the outcome of the run from the final JSON report payload."""
+
+        with self._connection:
+            self._connection.execute(
+                "UPDATE runs SET finished_at = ?, status = ?, error = ?, "
+                "same_misc_income = ? WHERE run_id = ?",
+                (
+                    iso_timestamp(),
+                    payload.get("status"),
+                    payload.get("error"),
+                    payload.get("same_misc_income"),
+                    self.run_id,
+                ),
+            )
+
+    def summary(self) -> dict[str, list[dict[str, Any]]]:
+        """Return row counts and amount deltas by reason and by account."""
+
+        def _query(view: str, column: str) -> list[dict[str, Any]]:
+            cursor = self._connection.execute(
+                f"SELECT kind, {column}, row_count, amount_delta FROM {view} "
+                f"WHERE run_id = ? ORDER BY kind, {column}",
+                (self.run_id,),
+            )
+            return [
+                {"kind": kind, column: key, "count": count, "amount_delta": delta}
+                for kind, key, count, delta in cursor
+            ]
+
+        return {
+            "by_reason": _query("reason_summary", "reason"),
+            "by_account": _query("account_summary", "account"),
+        }
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> ReportDatabase:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+__all__ = ["ReportDatabase", "RowKind", "DEFAULT_BATCH_SIZE"]
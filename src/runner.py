@@ -2,14 +2,23 @@ from __future__ import annotations
 import dataclasses
 from pathlib import Path
 import sys
-from typing import Dict, List
+from typing import Dict, List, Sequence
 
-from .excel_reader import extract_deposits
+from .excel_reader import DEFAULT_SHEET, extract_deposits_many, resolve_workbooks
+from .fingerprints import digest_parts, income_digest, workbook_digest
+from .input_settings import InputSettings
+from .journal import DEFAULT_JOURNAL_PATH, Journal
 from .qb_reader import fetch_deposit_lines
-from .qb_adder import add_misc_income
-from .comparer import compare_excel_qb
-from .models import Conflict, MiscIncome
+from .qb_adder import add_misc_income, resume_misc_income
+from .comparison_cache import DEFAULT_CACHE_DIR as DEFAULT_COMPARE_CACHE_DIR
+from .comparison_cache import ComparisonCache
+from .deposit_snapshot import DEFAULT_SNAPSHOT_PATH, sync_deposits
+from .models import Conflict, MiscIncome, RejectedRow
+from .plan import SyncPlan, read_plan, write_plan
+from .reference_cache import DEFAULT_CACHE_PATH, ReferenceData, load_reference_data
+from .report_db import ReportDatabase
 from .reporting import iso_timestamp, write_report
+from .validation import validate_deposits
 
 DEFAULT_REPORT_NAME = "misc_income_report.json"
 
@@ -33,6 +42,18 @@ def _conflict_to_dict(conflict: Conflict) -> Dict[str, object]:
     }
 
 
+def _rejected_to_dict(row: RejectedRow) -> Dict[str, object]:
+    amount = row.amount
+    if not (amount is None or isinstance(amount, (int, float, str))):
+        amount = str(amount)  # e.g. a date typed into the amount column
+    return {
+        "record_id": row.record_id,
+        "amount": amount,
+        "chart_of_account": row.chart_of_account,
+        "reason": row.reason,
+    }
+
+
 def _missing_in_excel_conflict(term: MiscIncome) -> Dict[str, object]:
     return {
         "record_id": term.record_id,
@@ -44,13 +65,178 @@ def _missing_in_excel_conflict(term: MiscIncome) -> Dict[str, object]:
     }
 
 
+def _read_qb_deposits(
+    settings: InputSettings,
+    references: ReferenceData,
+    deposit_snapshot_path: Path | None = None,
+    refresh_deposits: bool = False,
+) -> tuple[List[MiscIncome], str]:
+    """Return the deposit lines of the bank account and their digest."""
+
+    if deposit_snapshot_path is None:
+        qb_terms = fetch_deposit_lines(settings.bank_account, references.accounts)
+        return qb_terms, income_digest(qb_terms)
+    # Only deposits changed since the last run are fetched; when none
+    # changed, the stored digest also makes the comparison a cache hit.
+    snapshot = sync_deposits(
+        settings.bank_account,
+        references.accounts,
+        deposit_snapshot_path,
+        refresh=refresh_deposits,
+    )
+    return snapshot.incomes(), snapshot.digest
+
+
+def _build_plan(
+    workbook_paths: Sequence[Path],
+    sheets: Sequence[str] | None,
+    settings: InputSettings,
+    references: ReferenceData,
+    comparison_cache: ComparisonCache,
+    deposit_snapshot_path: Path | None = None,
+    refresh_deposits: bool = False,
+) -> SyncPlan:
+    """Read, validate and diff once; nothing is written to QuickBooks."""
+
+    # The validated Excel rows are a pure function of the workbook bytes, the
+    # sheets read and the account list, so hashing those (cheap, done for the
+    # plan anyway) identifies them; an unchanged workbook is not even read.
+    wb_digest = workbook_digest(workbook_paths)
+    excel_digest = digest_parts(
+        wb_digest, *(sheets or [DEFAULT_SHEET]), *sorted(references.accounts)
+    )
+    # Validate every row once, up front, so bad rows are rejected in bulk
+    # before anything is written to QuickBooks.
+    validation = comparison_cache.validate(
+        excel_digest,
+        lambda: validate_deposits(
+            extract_deposits_many(workbook_paths, sheets), references.accounts
+        ),
+    )
+    qb_terms, qb_digest = _read_qb_deposits(
+        settings, references, deposit_snapshot_path, refresh_deposits
+    )
+    comparison = comparison_cache.compare(
+        validation.valid, qb_terms, excel_digest=excel_digest, qb_digest=qb_digest
+    )
+    return SyncPlan(
+        bank_account=settings.bank_account,
+        workbooks=[str(path) for path in workbook_paths],
+        workbook_digest=wb_digest,
+        company_marker=references.company_marker,
+        deposits_digest=qb_digest,
+        created_at=iso_timestamp(),
+        adds=comparison.excel_only,
+        conflicts=comparison.conflicts,
+        qb_only=comparison.qb_only,
+        rejected=validation.rejected,
+        match_count=comparison.match_count,
+    )
+
+
+def _report_unfinished(journal: Journal, report_payload: Dict[str, object]) -> None:
+    """Compact the journal and mark the report partial if records remain."""
+
+    pending = journal.compact()
+    if pending:
+        report_payload["status"] = "partial"
+        report_payload["error"] = (
+            f"{len(pending.unsent)} record(s) were not sent and "
+            f"{len(pending.in_doubt)} are in doubt; rerun with --resume"
+        )
+
+
+def _report_plan(
+    plan: SyncPlan,
+    report_payload: Dict[str, object],
+    report_db: ReportDatabase | None = None,
+) -> None:
+    """Copy the conflicts, matches and rejections of ``plan`` into the report."""
+
+    conflicts: List[Dict[str, object]] = []
+    conflicts.extend(_conflict_to_dict(c) for c in plan.conflicts)
+    conflicts.extend(_missing_in_excel_conflict(t) for t in plan.qb_only)
+    rejected = [_rejected_to_dict(row) for row in plan.rejected]
+    report_payload["conflicts"] = conflicts
+    report_payload["same_misc_income"] = plan.match_count
+    report_payload["rejected_rows"] = rejected
+    if report_db is not None:
+        report_db.write("conflict", conflicts)
+        report_db.write("rejected", rejected)
+
+
+def _apply_plan(
+    plan: SyncPlan,
+    settings: InputSettings,
+    references: ReferenceData,
+    journal: Journal,
+    report_payload: Dict[str, object],
+    report_db: ReportDatabase | None = None,
+) -> None:
+    """Add the Excel-only records of ``plan`` to QuickBooks."""
+
+    if journal.pending().in_doubt:
+        raise RuntimeError(
+            "A previous run was interrupted with deposits in doubt; "
+            "rerun with --resume before starting a new sync"
+        )
+    # The plan was computed from the current workbook and QuickBooks, so it
+    # already holds every record an earlier run left unsent that is still
+    # wanted; the rest were removed from the workbook and must not be sent.
+    journal.rotate()
+
+    _report_plan(plan, report_payload, report_db)
+    acknowledged = {
+        item.record_id
+        for item in add_misc_income(
+            plan.adds, settings, references.accounts, journal=journal
+        )
+    }
+    # Only records QuickBooks confirmed; the rest stay in the journal
+    added = [
+        dataclasses.asdict(item) for item in plan.adds if item.record_id in acknowledged
+    ]
+    report_payload["added_misc_income"] = added
+    if report_db is not None:
+        report_db.write("added", added)
+    _report_unfinished(journal, report_payload)
+
+
 def run_misc_income(
-    workbook_path: Path,
+    workbook_path: Path | Sequence[Path | str] | None,
     *,
     bank_account_json: Path | str,
     output_path: str | None = None,
+    reference_cache_path: Path = DEFAULT_CACHE_PATH,
+    refresh_references: bool = False,
+    journal_path: Path = DEFAULT_JOURNAL_PATH,
+    resume: bool = False,
+    plan_path: Path | None = None,
+    apply_path: Path | None = None,
+    sheets: Sequence[str] | None = None,
+    compare_cache_dir: Path | None = DEFAULT_COMPARE_CACHE_DIR,
+    deposit_snapshot_path: Path | None = DEFAULT_SNAPSHOT_PATH,
+    report_db_path: Path | None = None,
 ) -> Path:
-    """Contract entry point for synchronising misc income."""
+    """Contract entry point for synchronising misc income.
+
+    ``workbook_path`` may be a single workbook or a list of workbooks and
+    glob patterns; ``sheets`` names the worksheets to read from each.
+    Comparison results are memoised in ``compare_cache_dir`` (in memory only
+    when it is None). QuickBooks deposits are kept in
+    ``deposit_snapshot_path`` and only re-read when they changed; None reads
+    them in full every run, as does ``refresh_references``.
+
+    With ``plan_path`` the sync is computed and written there as a plan, but
+    nothing is added to QuickBooks. With ``apply_path`` a saved plan is
+    executed without reading the workbook or comparing again, provided the
+    workbook, the company file and the deposits of the bank account are
+    unchanged. With ``resume`` the run finishes
+    the records an interrupted run left in the journal at ``journal_path``.
+
+    With ``report_db_path`` the report rows are also written, as the run
+    produces them, to a SQLite database that can be queried and summarised.
+    """
 
     report_path = Path(output_path) if output_path else Path(DEFAULT_REPORT_NAME)
     report_payload: Dict[str, object] = {
@@ -59,12 +245,17 @@ def run_misc_income(
         "added_misc_income": [],
         "conflicts": [],
         "same_misc_income": 0,
+        "rejected_rows": [],
         "error": None,
     }
 
-    from .input_settings import InputSettings
-
+    report_db: ReportDatabase | None = None
     try:
+        if report_db_path is not None:
+            report_db = ReportDatabase(
+                report_db_path, str(report_payload["generated_at"])
+            )
+
         # If running as a frozen exe, prefer treating the argument as the
         # bank account name. Otherwise, accept either a JSON path or a
         # direct bank account name.
@@ -77,42 +268,80 @@ def run_misc_income(
         else:
             settings = InputSettings.load(Path(bank_account_json))
 
-        excel_terms = extract_deposits(workbook_path)
-        qb_terms = fetch_deposit_lines(settings.bank_account)
-        comparison = compare_excel_qb(excel_terms, qb_terms)
-
-        # Re-fetch QB terms so that Excel-only items are included
-        updated_qb_terms = fetch_deposit_lines(settings.bank_account)
-        updated_comparison = compare_excel_qb(excel_terms, updated_qb_terms)
-
-        # Conflict collection (after adding Excel-only items)
-        conflicts: List[Dict[str, object]] = []
-        conflicts.extend(_conflict_to_dict(c) for c in updated_comparison.conflicts)
-        conflicts.extend(
-            _missing_in_excel_conflict(t) for t in updated_comparison.qb_only
-        )
-
-        # Count matched data after adding Excel-only terms
-        total_excel = len(excel_terms)
-        unmatched = len(updated_comparison.excel_only) + len(
-            updated_comparison.conflicts
+        # The account list is cached locally between runs
+        references = load_reference_data(
+            reference_cache_path, refresh=refresh_references
         )
-        matched = total_excel - unmatched
-        report_payload["same_misc_income"] = max(matched, 0)
+        if references.account_id(settings.bank_account) is None:
+            raise ValueError(
+                f"Bank account not found in QuickBooks: {settings.bank_account}"
+            )
 
-        # Add Excel-only misc income into QB first
-        add_misc_income(comparison.excel_only, settings)
-
-        # Add sections to report
-        report_payload["added_misc_income"] = [
-            dataclasses.asdict(item) for item in comparison.excel_only
-        ]
-        report_payload["conflicts"] = conflicts
+        journal = Journal(journal_path)
+        if resume:
+            resumed = [
+                dataclasses.asdict(item)
+                for item in resume_misc_income(settings, journal, references.accounts)
+            ]
+            report_payload["added_misc_income"] = resumed
+            if report_db is not None:
+                report_db.write("added", resumed)
+            _report_unfinished(journal, report_payload)
+        elif apply_path is not None:
+            plan = read_plan(apply_path)
+            if plan.bank_account != settings.bank_account:
+                raise ValueError(
+                    f"Plan was made for bank account {plan.bank_account}, "
+                    f"not {settings.bank_account}"
+                )
+            # The company marker alone misses changes to server-hosted files,
+            # so the deposits are re-read (one probe with a snapshot) and a
+            # plan is refused if any deposit of the account changed since.
+            _, deposits_digest = _read_qb_deposits(
+                settings, references, deposit_snapshot_path
+            )
+            plan.check(
+                workbook_digest(Path(p) for p in plan.workbooks),
+                references.company_marker,
+                deposits_digest,
+            )
+            _apply_plan(plan, settings, references, journal, report_payload, report_db)
+        elif workbook_path is None:
+            raise ValueError("A workbook is required unless applying or resuming")
+        else:
+            workbooks = (
+                [workbook_path]
+                if isinstance(workbook_path, (str, Path))
+                else list(workbook_path)
+            )
+            plan = _build_plan(
+                resolve_workbooks(workbooks),
+                sheets,
+                settings,
+                references,
+                ComparisonCache(compare_cache_dir),
+                deposit_snapshot_path,
+                refresh_references,
+            )
+            if plan_path is not None:
+                write_plan(plan, plan_path)
+                _report_plan(plan, report_payload, report_db)
+                planned = [dataclasses.asdict(item) for item in plan.adds]
+                report_payload["planned_misc_income"] = planned
+                if report_db is not None:
+                    report_db.write("planned", planned)
+            else:
+                _apply_plan(
+                    plan, settings, references, journal, report_payload, report_db
+                )
 
     except Exception as exc:
         report_payload["status"] = "error"
         report_payload["error"] = str(exc)
 
+    if report_db is not None:
+        report_db.finish(report_payload)
+        report_db.close()
     write_report(report_payload, report_path)
     return report_path
 
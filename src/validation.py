@@ -0,0 +1,132 @@
+"""Pre-flight validation and normalisation of Excel deposit rows.
+
+Rows are checked once, in a single pass, between reading the workbook and
+diffing against QuickBooks. Amounts are normalised to whole cents and
+chart-of-account names are checked against the account list fetched from
+QuickBooks, so bad rows are rejected in bulk before any write is attempted.
+"""
+
+from __future__ import annotations
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Collection, Iterable
+
+from src.models import MiscIncome, RejectedRow, RejectionReason, ValidationResult
+
+_CENT = Decimal("0.01")
+
+
+def to_cents(value: object) -> int:
+    """Return ``value`` as a whole number of cents.
+
+    Raises ``ValueError`` if the value is blank, non-numeric or not finite.
+    """
+
+    if value is None or isinstance(value, bool):
+        raise ValueError(f"amount is not numeric: {value!r}")
+    if isinstance(value, int):
+        return value * 100
+    text = str(value).strip().replace(",", "")
+    try:
+        amount = Decimal(text)
+    except InvalidOperation as exc:
+        raise ValueError(f"amount is not numeric: {value!r}") from exc
+    if not amount.is_finite():
+        raise ValueError(f"amount is not finite: {value!r}")
+    try:
+        return int(amount.quantize(_CENT, rounding=ROUND_HALF_UP) * 100)
+    except InvalidOperation as exc:
+        # More digits than the decimal context holds, e.g. 1e30
+        raise ValueError(f"amount is out of range: {value!r}") from exc
+
+
+def income_cents(income: MiscIncome) -> int:
+    """Return the amount of ``income`` in whole cents.
+
+    Validated records and QuickBooks lines carry their cents; for any other
+    record they are derived from the amount with the same rounding.
+    """
+
+    return income.cents if income.cents is not None else to_cents(income.amount)
+
+
+def _normalise_id(value: object) -> str:
+    """Return a record id as text, dropping the ``.0`` Excel adds to integers."""
+
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip() if value is not None else ""
+
+
+def validate_deposits(
+    records: Iterable[MiscIncome], known_accounts: Collection[str] | None = None
+) -> ValidationResult:
+    """Normalise Excel rows and reject the ones QuickBooks would refuse.
+
+    ``known_accounts`` is the set of active chart-of-account names in
+    QuickBooks; when it is ``None`` the account check is skipped. Rows sharing
+    a record id are all rejected, since the comparer keys on record id.
+    """
+
+    result = ValidationResult()
+    accepted: dict[str, MiscIncome] = {}
+    duplicates: set[str] = set()
+
+    def _reject(record_id: str, item: MiscIncome, reason: RejectionReason) -> None:
+        result.rejected.append(
+            RejectedRow(
+                record_id=record_id,
+                amount=item.amount,
+                chart_of_account=str(item.chart_of_account or ""),
+                reason=reason,
+            )
+        )
+
+    for item in records:
+        record_id = _normalise_id(item.record_id)
+        if not record_id:
+            _reject(record_id, item, "missing_record_id")
+            continue
+        if item.amount is None or (
+            isinstance(item.amount, str) and not item.amount.strip()
+        ):
+            _reject(record_id, item, "missing_amount")
+            continue
+        try:
+            cents = to_cents(item.amount)
+        except ValueError:
+            _reject(record_id, item, "invalid_amount")
+            continue
+        account = str(item.chart_of_account or "").strip()
+        if not account:
+            _reject(record_id, item, "missing_chart_of_account")
+            continue
+        if known_accounts is not None and account not in known_accounts:
+            _reject(record_id, item, "unknown_chart_of_account")
+            continue
+        if record_id in accepted or record_id in duplicates:
+            duplicates.add(record_id)
+            _reject(record_id, item, "duplicate_record_id")
+            continue
+
+        accepted[record_id] = MiscIncome(
+            record_id=record_id,
+            amount=cents / 100,
+            chart_of_account=account,
+            source=item.source,
+            customer_name=item.customer_name,
+            cents=cents,
+        )
+
+    # The first occurrence of a duplicated id was accepted before the clash
+    # was seen; move it to the rejected list as well.
+    for record_id in duplicates:
+        first = accepted.pop(record_id, None)
+        if first is not None:
+            _reject(record_id, first, "duplicate_record_id")
+
+    result.valid.extend(accepted.values())
+    return result
+
+
+__all__ = ["to_cents", "income_cents", "validate_deposits"]
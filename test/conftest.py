@@ -0,0 +1,50 @@
+"""Records and a fake QuickBooks session shared by the tests."""
+
+from contextlib import contextmanager
+
+from src.models import MiscIncome, SourceLiteral
+
+
+def income(
+    record_id, amount=10.0, account="Rental", source: SourceLiteral = "excel"
+) -> MiscIncome:
+    return MiscIncome(
+        record_id=record_id, amount=amount, chart_of_account=account, source=source
+    )
+
+
+def add_rs(record_id: str, status: int = 0) -> str:
+    """Return the ``DepositAddRs`` QuickBooks sends for one added record."""
+
+    if status:
+        return f'<DepositAddRs statusCode="{status}" statusMessage="in use"/>'
+    return (
+        f'<DepositAddRs statusCode="0"><DepositRet><TxnID>T{record_id}</TxnID>'
+        f"<DepositTotal>10.00</DepositTotal><DepositLineRet><Memo>{record_id}</Memo>"
+        "<AccountRef><FullName>Rental</FullName></AccountRef></DepositLineRet>"
+        "</DepositRet></DepositAddRs>"
+    )
+
+
+class FakeSession:
+    """Answers ``ProcessRequest`` with the next response, or raises it."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests: list[str] = []
+
+    def ProcessRequest(self, ticket, qbxml):
+        self.requests.append(qbxml)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return f"<QBXML><QBXMLMsgsRs>{response}</QBXMLMsgsRs></QBXML>"
+
+    def factory(self):
+        """Return a session factory, as taken by ``QBTransport``, for this fake."""
+
+        @contextmanager
+        def session_factory():
+            yield self, "ticket"
+
+        return session_factory
@@ -0,0 +1,32 @@
+from src.comparer import compare_excel_qb
+from src.qb_reader import _iter_deposits
+from test.conftest import income
+
+_RESPONSE = """<?xml version="1.0" ?>
+<QBXML><QBXMLMsgsRs><DepositQueryRs statusCode="0" statusMessage="Status OK">
+<DepositRet><TxnID>T1</TxnID><DepositToAccountRef><FullName>Chase</FullName>
+</DepositToAccountRef><DepositTotal>350.00</DepositTotal>
+<DepositLineRet><TxnLineID>L2</TxnLineID><AccountRef><FullName>Rental</FullName>
+</AccountRef><Memo>7780</Memo><Amount>100.00</Amount></DepositLineRet>
+<DepositLineRet><TxnLineID>L1</TxnLineID><AccountRef><FullName>Rental</FullName>
+</AccountRef><Memo>7780</Memo><Amount>50.00</Amount></DepositLineRet>
+<DepositLineRet><TxnLineID>L3</TxnLineID>
+<AccountRef><FullName>Misc Credits</FullName></AccountRef><Memo>7781</Memo><Amount>200.00</Amount></DepositLineRet>
+</DepositRet></DepositQueryRs></QBXMLMsgsRs></QBXML>"""
+
+
+def test_multi_line_deposits_are_compared_line_by_line():
+    lines = [line for _, line in _iter_deposits(_RESPONSE)]
+    assert [(line.txn_line_id, line.amount) for line in lines] == [
+        ("L2", 100.0),
+        ("L1", 50.0),
+        ("L3", 200.0),
+    ]
+
+    report = compare_excel_qb(
+        [income("7780", 100.0, "Rental"), income("7781", 250.0, "Misc Credits")],
+        lines,
+    )
+    assert report.match_count == 1
+    assert [item.txn_line_id for item in report.qb_only] == ["L1"]
+    assert [c.record_id for c in report.conflicts] == ["7781"]
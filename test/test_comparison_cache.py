@@ -0,0 +1,90 @@
+from src import comparison_cache
+from src.comparison_cache import ComparisonCache
+from test.conftest import income
+
+
+def _count_compares(monkeypatch) -> list[int]:
+    calls: list[int] = []
+    real = comparison_cache.compare_excel_qb
+
+    def counting(excel_data, qb_data):
+        calls.append(1)
+        return real(excel_data, qb_data)
+
+    monkeypatch.setattr(comparison_cache, "compare_excel_qb", counting)
+    return calls
+
+
+def test_hit_is_order_independent_and_persists(tmp_path, monkeypatch):
+    calls = _count_compares(monkeypatch)
+    excel = [income("1", 10.0), income("2", 20.0)]
+    qb = [
+        income("2", 25.0, source="quickbooks"),
+        income("3", 30.0, source="quickbooks"),
+    ]
+
+    first = ComparisonCache(tmp_path).compare(excel, qb)
+    second = ComparisonCache(tmp_path).compare(excel[::-1], qb[::-1])
+
+    assert len(calls) == 1
+    assert second == first
+    assert [c.record_id for c in second.conflicts] == ["2"]
+
+
+def test_changed_input_misses(tmp_path, monkeypatch):
+    calls = _count_compares(monkeypatch)
+    cache = ComparisonCache(tmp_path)
+    cache.compare([income("1", 10.0)], [])
+    cache.compare([income("1", 10.01)], [])
+
+    assert len(calls) == 2
+
+
+def test_line_identity_is_part_of_the_key(tmp_path, monkeypatch):
+    calls = _count_compares(monkeypatch)
+    cache = ComparisonCache(tmp_path)
+    moved = income("1", 10.0, source="quickbooks")
+    moved.txn_line_id = "L-2"
+    cache.compare([], [income("1", 10.0, source="quickbooks")])
+    report = cache.compare([], [moved])
+
+    assert len(calls) == 2
+    assert report.qb_only[0].txn_line_id == "L-2"
+
+
+def test_validated_rows_are_reused_without_rebuilding(tmp_path):
+    from src.models import RejectedRow, ValidationResult
+
+    built: list[int] = []
+
+    def build() -> ValidationResult:
+        built.append(1)
+        return ValidationResult(
+            valid=[income("1", 10.0)],
+            rejected=[RejectedRow("2", None, "Rental", "missing_amount")],
+        )
+
+    first = ComparisonCache(tmp_path).validate("workbook-digest", build)
+    second = ComparisonCache(tmp_path).validate("workbook-digest", build)
+    ComparisonCache(tmp_path).validate("other-digest", build)
+
+    assert len(built) == 2
+    assert second == first
+
+
+def test_entries_evicted_by_count_and_age(tmp_path):
+    clock = [1000.0]
+    cache = ComparisonCache(tmp_path, max_entries=2, max_age=60, now=lambda: clock[0])
+    for amount in (1.0, 2.0, 3.0):
+        clock[0] += 1
+        cache.compare([income("1", amount)], [])
+
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+    clock[0] += 120
+    fresh = ComparisonCache(tmp_path, max_age=60, now=lambda: clock[0])
+    key = ComparisonCache.key(
+        comparison_cache.income_digest([income("1", 3.0)]),
+        comparison_cache.income_digest([]),
+    )
+    assert fresh.get(key) is None
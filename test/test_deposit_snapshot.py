@@ -0,0 +1,68 @@
+from src.deposit_snapshot import sync_deposits
+from src.models import MiscIncome, QBDeposit
+
+
+def _deposit(txn_id, edit_sequence, time_modified, record_id, amount):
+    return QBDeposit(
+        txn_id=txn_id,
+        edit_sequence=edit_sequence,
+        time_modified=time_modified,
+        lines=[
+            MiscIncome(
+                record_id=record_id,
+                amount=amount,
+                chart_of_account="Misc Credits",
+                source="quickbooks",
+                customer_name="Chase",
+            )
+        ],
+    )
+
+
+def test_probe_skips_fetch_when_unchanged_and_fetches_only_changes(tmp_path):
+    qb = {
+        "T1": _deposit("T1", "1", "2025-11-01T09:00:00-08:00", "100", 10.0),
+        "T2": _deposit("T2", "1", "2025-11-02T09:00:00-08:00", "200", 20.0),
+    }
+    fetches: list[object] = []
+    probes: list[str] = []
+    deleted: list[str] = []
+
+    def fetch(bank_account, account_ids, txn_ids=None):
+        fetches.append(txn_ids)
+        return [qb[t] for t in (txn_ids or qb) if t in qb]
+
+    def probe(bank_account, since, account_ids):
+        probes.append(since)
+        modified = {
+            d.txn_id: (d.edit_sequence, d.time_modified)
+            for d in qb.values()
+            if d.time_modified >= since
+        }
+        return modified, deleted
+
+    def sync():
+        return sync_deposits(
+            "Chase",
+            {"Chase": "A1"},
+            tmp_path / "deposits.json",
+            fetch=fetch,
+            probe=probe,
+            now=lambda: 1000.0,
+        )
+
+    first = sync()
+    unchanged = sync()
+    assert fetches == [None]
+    assert probes == ["2025-11-02T08:59:00-08:00"]
+    assert unchanged.digest == first.digest
+
+    qb["T2"] = _deposit("T2", "2", "2025-11-03T09:00:00-08:00", "200", 25.0)
+    del qb["T1"]
+    deleted.append("T1")
+    changed = sync()
+
+    assert fetches == [None, ["T2"]]
+    assert [i.amount for i in changed.incomes()] == [25.0]
+    assert changed.digest != first.digest
+    assert changed.watermark == "2025-11-03T09:00:00-08:00"
@@ -0,0 +1,43 @@
+import shutil
+from pathlib import Path
+
+from src.excel_reader import extract_deposits, extract_deposits_many, resolve_workbooks
+
+WORKBOOK = Path(__file__).resolve().parents[1] / "company_data.xlsx"
+
+
+def test_extract_deposits_many_merges_and_deduplicates(tmp_path):
+    for name in ("entity_a_2025_01.xlsx", "entity_b_2025_01.xlsx"):
+        shutil.copy(WORKBOOK, tmp_path / name)
+
+    single = extract_deposits(WORKBOOK)
+    merged = extract_deposits_many([tmp_path / "entity_*.xlsx"], max_workers=2)
+
+    assert len(single) > 0
+    assert [r.record_id for r in merged] == [r.record_id for r in single]
+
+
+def test_existing_file_with_glob_characters_is_taken_literally(tmp_path):
+    download = tmp_path / "company_data[1].xlsx"
+    shutil.copy(WORKBOOK, download)
+
+    assert resolve_workbooks([download]) == [download]
+
+
+def test_repeats_within_one_workbook_are_left_for_validation(tmp_path):
+    from openpyxl import Workbook
+
+    from src.excel_reader import DEFAULT_SHEET
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = DEFAULT_SHEET
+    sheet.append(["Parent ID", "Child ID", "Check Amount", "Tier 2 - Chart of Account"])
+    sheet.append(["P1", "7780", 800, "Rental"])
+    sheet.append(["P1", "7780", 800, "Rental"])
+    workbook.save(tmp_path / "a.xlsx")
+    shutil.copy(tmp_path / "a.xlsx", tmp_path / "b.xlsx")
+
+    records = extract_deposits_many([tmp_path / "*.xlsx"], max_workers=1)
+
+    assert [r.record_id for r in records] == ["7780", "7780"]
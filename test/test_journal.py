@@ -0,0 +1,71 @@
+import pytest
+
+from src import qb_adder
+from src.input_settings import InputSettings
+from src.journal import Journal
+from test.conftest import FakeSession, add_rs, income
+
+
+def _use_session(monkeypatch, session):
+    monkeypatch.setattr(qb_adder, "_qb_session", session.factory())
+
+
+def test_journal_tracks_stages(tmp_path):
+    journal = Journal(tmp_path / "journal.jsonl")
+    run_id = journal.start_run("Chase", [[income("1"), income("2")], [income("3")]])
+    journal.sent(run_id, 0)
+    journal.acknowledged(run_id, 0, {"1": "T1"}, {})
+
+    pending = journal.pending()
+    assert [i.record_id for i in pending.in_doubt] == ["2"]
+    assert [i.record_id for i in pending.unsent] == ["3"]
+    assert pending.bank_account == "Chase"
+
+
+def test_compaction_keeps_only_pending_records(tmp_path):
+    journal = Journal(tmp_path / "journal.jsonl")
+    done = journal.start_run("Chase", [[income("1")]])
+    journal.sent(done, 0)
+    journal.acknowledged(done, 0, {"1": "T1"})
+    run_id = journal.start_run("Chase", [[income("2"), income("3")], [income("4")]])
+    journal.sent(run_id, 0)
+    journal.acknowledged(run_id, 0, {"2": "T2"})
+    before = journal.pending()
+
+    after = journal.compact()
+
+    assert after == before == journal.pending()
+    assert len(journal.path.read_text().splitlines()) == 3
+    journal.acknowledged(run_id, 0, {"3": "T3"})
+    journal.acknowledged(run_id, 1, {"4": "T4"})
+    assert not journal.compact()
+    assert not journal.path.exists()
+    assert journal.path.with_name("journal.jsonl.1").exists()
+
+
+def test_interrupted_add_resumes_without_double_posting(tmp_path, monkeypatch):
+    journal = Journal(tmp_path / "journal.jsonl")
+    settings = InputSettings(bank_account="Chase")
+    incomes = [income("1"), income("2"), income("3")]
+
+    _use_session(monkeypatch, FakeSession([add_rs("1"), OSError("RPC")]))
+    with pytest.raises(RuntimeError, match="--resume"):
+        qb_adder.add_misc_income(incomes, settings, journal=journal, chunk_size=1)
+
+    pending = journal.pending()
+    assert [i.record_id for i in pending.in_doubt] == ["2"]
+    assert [i.record_id for i in pending.unsent] == ["3"]
+
+    # Record 2 did reach QuickBooks before the connection dropped
+    monkeypatch.setattr(
+        qb_adder,
+        "fetch_deposits_modified_since",
+        lambda bank, since, ids: [("T2", income("2"))],
+    )
+    session = FakeSession([add_rs("3")])
+    _use_session(monkeypatch, session)
+    added = qb_adder.resume_misc_income(settings, journal, chunk_size=1)
+
+    assert sorted(i.record_id for i in added) == ["2", "3"]
+    assert len(session.requests) == 1 and "<Memo>3</Memo>" in session.requests[0]
+    assert not journal.pending()
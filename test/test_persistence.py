@@ -0,0 +1,22 @@
+from src.models import Conflict, MiscIncome
+from src.persistence import from_rows, read_json, to_rows, write_json
+
+
+def test_rows_round_trip_through_a_versioned_file(tmp_path):
+    incomes = [
+        MiscIncome("1", 10.5, "Rental", "quickbooks", "Chase", "L-1"),
+        MiscIncome("2", 3.0, "Misc Credits", "excel"),
+    ]
+    conflicts = [Conflict("1", "Rental", "Misc Credits", 10.5, 11.0, "data_mismatch")]
+    path = write_json(
+        tmp_path / "nested" / "data.json",
+        {"version": 1, "incomes": to_rows(incomes), "conflicts": to_rows(conflicts)},
+    )
+
+    data = read_json(path, 1)
+    assert data is not None
+    assert from_rows(MiscIncome, data["incomes"]) == incomes
+    assert from_rows(Conflict, data["conflicts"]) == conflicts
+    assert read_json(path, 2) is None
+    assert read_json(tmp_path / "missing.json", 1) is None
+    assert not list(path.parent.glob("*.tmp"))
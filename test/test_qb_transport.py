@@ -0,0 +1,114 @@
+from contextlib import contextmanager
+
+import pytest
+
+from src import qb_adder
+from src.input_settings import InputSettings
+from src.journal import Journal
+from src.qb_transport import (
+    CircuitBreaker,
+    CircuitOpenError,
+    QBTransport,
+    RetryPolicy,
+    classify_error,
+)
+from test.conftest import FakeSession, add_rs, income
+
+CALL_REJECTED = -2147418111  # RPC_E_CALL_REJECTED as pywin32 reports it
+DISCONNECTED = -2147417848  # RPC_E_DISCONNECTED
+
+
+class _ComError(Exception):
+    """Shaped like ``pywintypes.com_error``: (hresult, text, excepinfo, arg)."""
+
+
+def _transport(session, sleeps, **kwargs):
+    return QBTransport(session.factory(), sleep=sleeps.append, **kwargs)
+
+
+def test_adds_ride_out_rejected_calls_and_records_in_use(tmp_path):
+    sleeps: list[float] = []
+    session = FakeSession(
+        [
+            _ComError(CALL_REJECTED, "Call was rejected by callee.", None, None),
+            add_rs("1") + add_rs("2", status=3176),
+            add_rs("2"),
+        ]
+    )
+    transport = _transport(session, sleeps)
+    journal = Journal(tmp_path / "journal.jsonl")
+
+    added = qb_adder.add_misc_income(
+        [income("1"), income("2")],
+        InputSettings(bank_account="Chase"),
+        journal=journal,
+        transport=transport,
+    )
+
+    assert [i.record_id for i in added] == ["1", "2"]
+    requests = session.requests
+    assert len(requests) == 3 and "<Memo>1</Memo>" not in requests[2]
+    assert len(sleeps) == 2
+    assert not journal.pending()
+
+
+def test_unprocessed_chunk_is_failed_and_later_chunks_still_sent(tmp_path):
+    rejected = _ComError(CALL_REJECTED, "Call was rejected by callee.", None, None)
+    transport = _transport(
+        FakeSession([rejected, rejected, add_rs("2")]),
+        [],
+        policy=RetryPolicy(max_attempts=2),
+    )
+    journal = Journal(tmp_path / "journal.jsonl")
+
+    added = qb_adder.add_misc_income(
+        [income("1"), income("2")],
+        InputSettings(bank_account="Chase"),
+        journal=journal,
+        chunk_size=1,
+        transport=transport,
+    )
+
+    pending = journal.pending()
+    assert [i.record_id for i in added] == ["2"]
+    assert [i.record_id for i in pending.unsent] == ["1"]
+    assert not pending.in_doubt
+
+
+def test_session_refused_before_sending_is_not_in_doubt(tmp_path):
+    @contextmanager
+    def session_factory():
+        raise _ComError(-2147024891, "Access is denied.", None, None)
+        yield
+
+    journal = Journal(tmp_path / "journal.jsonl")
+    qb_adder.add_misc_income(
+        [income("1"), income("2")],
+        InputSettings(bank_account="Chase"),
+        journal=journal,
+        chunk_size=1,
+        transport=QBTransport(session_factory),
+    )
+
+    pending = journal.pending()
+    assert [i.record_id for i in pending.unsent] == ["1", "2"]
+    assert not pending.in_doubt
+
+
+def test_ambiguous_failures_and_open_circuit():
+    dropped = _ComError(
+        DISCONNECTED, "The object invoked has disconnected.", None, None
+    )
+    assert classify_error(dropped) == "ambiguous"
+    assert classify_error(ValueError("boom")) == "fatal"
+
+    with pytest.raises(_ComError):
+        _transport(FakeSession([dropped]), []).process("<add/>", idempotent=False)
+
+    session = FakeSession([dropped, dropped, dropped])
+    transport = _transport(
+        session, [], breaker=CircuitBreaker(failure_threshold=2, now=lambda: 0.0)
+    )
+    with pytest.raises(CircuitOpenError):
+        transport.process("<query/>", idempotent=True)
+    assert len(session.requests) == 2
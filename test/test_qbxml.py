@@ -0,0 +1,65 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from src.qbxml import build_deposit_add_batch, escape_xml, iter_deposit_add_batches
+from test.conftest import income
+
+
+def test_escape_xml_only_touches_special_characters():
+    assert escape_xml("Rental") == "Rental"
+    assert escape_xml("R&D <\"x'>") == "R&amp;D &lt;&quot;x&apos;&gt;"
+    assert escape_xml(7780) == "7780"
+
+
+def test_build_deposit_add_batch_is_well_formed():
+    qbxml = build_deposit_add_batch(
+        [income("7780", 800, "R&D"), income("7781", 12.5, "Rental")], "100% Chase"
+    )
+    root = ET.fromstring(qbxml)
+    adds = root.findall(".//DepositAdd")
+
+    assert len(adds) == 2
+    assert adds[0].findtext("DepositToAccountRef/FullName") == "100% Chase"
+    assert adds[0].findtext("DepositLineAdd/AccountRef/FullName") == "R&D"
+    assert adds[1].findtext("DepositLineAdd/Amount") == "12.50"
+
+
+def test_iter_deposit_add_batches_chunks_input():
+    incomes = [income(str(i), i, "Rental") for i in range(5)]
+    chunks = [chunk for chunk, _ in iter_deposit_add_batches(incomes, "Chase", 2)]
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+
+def test_build_deposit_add_batch_rejects_blank_amount():
+    with pytest.raises(ValueError, match="amount must be numeric"):
+        build_deposit_add_batch([income("1", None, "Rental")], "Chase")  # type: ignore[arg-type]
+
+
+def test_build_deposit_add_batch_prefers_list_ids():
+    qbxml = build_deposit_add_batch(
+        [income("1", 5, "Rental"), income("2", 5, "Unknown")],
+        "Chase",
+        {"Chase": "80000001-1", "Rental": "80000002-1"},
+    )
+    adds = ET.fromstring(qbxml).findall(".//DepositAdd")
+
+    assert adds[0].findtext("DepositToAccountRef/ListID") == "80000001-1"
+    assert adds[0].findtext("DepositLineAdd/AccountRef/ListID") == "80000002-1"
+    assert adds[1].findtext("DepositLineAdd/AccountRef/FullName") == "Unknown"
+
+
+def test_deposit_query_requests_only_the_fields_the_reader_uses():
+    from src.qb_reader import DEPOSIT_RET_ELEMENTS, _deposit_query
+
+    query = ET.fromstring(_deposit_query("Chase", {"Chase": "A1"})).find(
+        ".//DepositQueryRq"
+    )
+    assert query is not None
+    tags = [child.tag for child in query]
+    included = [e.text for e in query.findall("IncludeRetElement")]
+
+    assert tags[:2] == ["AccountFilter", "IncludeLineItems"]
+    assert included == list(DEPOSIT_RET_ELEMENTS)
+    assert {"DepositToAccountRef", "DepositLineRet"} <= set(included)
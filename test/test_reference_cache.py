@@ -0,0 +1,35 @@
+from src.reference_cache import load_reference_data
+
+
+def _loader(tmp_path, calls, marker="company.qbw|1", now=1000.0):
+    def fetch_accounts():
+        calls.append(1)
+        return {"Chase": "A1", "Rental": "A2"}
+
+    return lambda **kwargs: load_reference_data(
+        tmp_path / "refs.json",
+        ttl=60,
+        fetch_accounts=fetch_accounts,
+        fetch_marker=lambda: marker,
+        now=lambda: now,
+        **kwargs,
+    )
+
+
+def test_reference_cache_reused_within_ttl(tmp_path):
+    calls: list[int] = []
+    first = _loader(tmp_path, calls)()
+    second = _loader(tmp_path, calls, now=1030.0)()
+
+    assert len(calls) == 1
+    assert second.account_id("Rental") == first.account_id("Rental") == "A2"
+
+
+def test_reference_cache_refetched_on_expiry_or_company_change(tmp_path):
+    calls: list[int] = []
+    _loader(tmp_path, calls)()
+    _loader(tmp_path, calls, now=1100.0)()
+    _loader(tmp_path, calls, marker="company.qbw|2", now=1100.0)()
+    _loader(tmp_path, calls, marker="company.qbw|2", now=1100.0)(refresh=True)
+
+    assert len(calls) == 4
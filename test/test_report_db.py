@@ -0,0 +1,79 @@
+import sqlite3
+
+from src.report_db import ReportDatabase
+
+
+def test_report_rows_are_indexed_and_summarised(tmp_path):
+    path = tmp_path / "report.db"
+    conflicts = [
+        {
+            "record_id": str(7000 + i),
+            "qb_chart_of_account": "Rental",
+            "excel_chart_of_account": None,
+            "qb_amount": 10.0,
+            "excel_amount": None,
+            "reason": "missing_in_excel",
+        }
+        for i in range(7)
+    ]
+    conflicts.append(
+        {
+            "record_id": "7779",
+            "qb_chart_of_account": "Taxes-Property",
+            "excel_chart_of_account": "Taxes-Property",
+            "qb_amount": 800.0,
+            "excel_amount": 700.0,
+            "reason": "data_mismatch",
+        }
+    )
+    with ReportDatabase(path, batch_size=3) as report_db:
+        assert report_db.write("conflict", conflicts) == 8
+        report_db.write(
+            "rejected",
+            [
+                {
+                    "record_id": "7781",
+                    "amount": "abc",
+                    "chart_of_account": "Rental",
+                    "reason": "invalid_amount",
+                }
+            ],
+        )
+        report_db.finish({"status": "success", "same_misc_income": 4})
+        summary = report_db.summary()
+
+    assert summary["by_reason"] == [
+        {
+            "kind": "conflict",
+            "reason": "data_mismatch",
+            "count": 1,
+            "amount_delta": -100.0,
+        },
+        {
+            "kind": "conflict",
+            "reason": "missing_in_excel",
+            "count": 7,
+            "amount_delta": -70.0,
+        },
+        {
+            "kind": "rejected",
+            "reason": "invalid_amount",
+            "count": 1,
+            "amount_delta": None,
+        },
+    ]
+    assert [(r["account"], r["count"]) for r in summary["by_account"]] == [
+        ("Rental", 7),
+        ("Taxes-Property", 1),
+        ("Rental", 1),
+    ]
+
+    with sqlite3.connect(path) as connection:
+        plan = connection.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM report_rows "
+            "WHERE run_id = ? AND record_id = ?",
+            (report_db.run_id, "7779"),
+        ).fetchall()
+        status = connection.execute("SELECT status FROM runs").fetchone()
+    assert "report_rows_record_id" in str(plan)
+    assert status == ("success",)
@@ -1,7 +1,11 @@
+from pathlib import Path
+
 import pytest
 
 from src.models import MiscIncome
 
+WORKBOOK = Path(__file__).resolve().parents[1] / "company_data.xlsx"
+
 
 @pytest.fixture
 def mock_excel_terms():
@@ -39,3 +43,157 @@ def test_misc_income_attributes(mock_excel_terms):
         "source='excel')"
     )
     assert str(term) == expected_str
+
+
+@pytest.fixture
+def fake_quickbooks(monkeypatch):
+    """Replace every QuickBooks call made by the runner with in-memory fakes."""
+
+    from src import runner
+    from src.excel_reader import extract_deposits
+    from src.reference_cache import ReferenceData
+
+    accounts = {
+        r.chart_of_account: f"ID-{i}" for i, r in enumerate(extract_deposits(WORKBOOK))
+    }
+    accounts["Chase"] = "ID-bank"
+    state = {
+        "marker": "company|1",
+        "fetches": 0,
+        "added": [],
+        "deposits": [
+            MiscIncome(
+                record_id="123",
+                amount=200.0,
+                chart_of_account="Misc Credits",
+                source="quickbooks",
+            )
+        ],
+    }
+
+    def load_reference_data(*args, **kwargs):
+        return ReferenceData(accounts=accounts, company_marker=state["marker"])
+
+    def fetch_deposit_lines(*args, **kwargs):
+        state["fetches"] += 1
+        return list(state["deposits"])
+
+    def add_misc_income(incomes, *args, **kwargs):
+        state["added"].extend(incomes)
+        return incomes
+
+    monkeypatch.setattr(runner, "load_reference_data", load_reference_data)
+    monkeypatch.setattr(runner, "fetch_deposit_lines", fetch_deposit_lines)
+    monkeypatch.setattr(runner, "add_misc_income", add_misc_income)
+    return state
+
+
+def test_plan_then_apply_skips_reading_and_comparing(tmp_path, fake_quickbooks):
+    import json
+
+    from src.runner import run_misc_income
+
+    plan_path = tmp_path / "plan.json"
+    report = run_misc_income(
+        WORKBOOK,
+        bank_account_json="Chase",
+        output_path=str(tmp_path / "plan_report.json"),
+        journal_path=tmp_path / "journal.jsonl",
+        compare_cache_dir=None,
+        deposit_snapshot_path=None,
+        plan_path=plan_path,
+    )
+    planned = json.loads(report.read_text())
+    assert planned["status"] == "success"
+    assert fake_quickbooks["added"] == []
+    assert fake_quickbooks["fetches"] == 1
+
+    report = run_misc_income(
+        None,
+        bank_account_json="Chase",
+        output_path=str(tmp_path / "apply_report.json"),
+        journal_path=tmp_path / "journal.jsonl",
+        compare_cache_dir=None,
+        deposit_snapshot_path=None,
+        apply_path=plan_path,
+    )
+    applied = json.loads(report.read_text())
+    assert applied["status"] == "success"
+    assert fake_quickbooks["fetches"] == 2  # Only to check the deposits
+    assert len(fake_quickbooks["added"]) == len(planned["planned_misc_income"]) > 0
+
+
+def test_apply_refuses_stale_plan(tmp_path, fake_quickbooks):
+    import json
+
+    from src.runner import run_misc_income
+
+    plan_path = tmp_path / "plan.json"
+    common = {
+        "bank_account_json": "Chase",
+        "journal_path": tmp_path / "j.jsonl",
+        "compare_cache_dir": None,
+        "deposit_snapshot_path": None,
+    }
+    run_misc_income(
+        WORKBOOK, output_path=str(tmp_path / "a.json"), plan_path=plan_path, **common
+    )
+    fake_quickbooks["marker"] = "company|2"
+    report = run_misc_income(
+        None, output_path=str(tmp_path / "b.json"), apply_path=plan_path, **common
+    )
+
+    payload = json.loads(report.read_text())
+    assert payload["status"] == "error"
+    assert "company file changed" in payload["error"]
+
+    # A server-hosted file keeps its marker; the deposits still give it away
+    fake_quickbooks["marker"] = "company|1"
+    fake_quickbooks["deposits"].append(
+        MiscIncome(
+            record_id="7780",
+            amount=800.0,
+            chart_of_account="Rental",
+            source="quickbooks",
+        )
+    )
+    report = run_misc_income(
+        None, output_path=str(tmp_path / "c.json"), apply_path=plan_path, **common
+    )
+
+    payload = json.loads(report.read_text())
+    assert payload["status"] == "error"
+    assert "deposits changed" in payload["error"]
+    assert fake_quickbooks["added"] == []
+
+
+def test_unsent_records_make_the_run_partial(tmp_path, fake_quickbooks, monkeypatch):
+    import json
+
+    from src import runner
+
+    def add_misc_income(incomes, *args, journal, **kwargs):
+        journal.start_run("Chase", [incomes])  # QuickBooks never processed them
+        return []
+
+    monkeypatch.setattr(runner, "add_misc_income", add_misc_income)
+    common = {
+        "bank_account_json": "Chase",
+        "output_path": str(tmp_path / "report.json"),
+        "journal_path": tmp_path / "journal.jsonl",
+        "compare_cache_dir": None,
+        "deposit_snapshot_path": None,
+    }
+    report = runner.run_misc_income(WORKBOOK, **common)
+
+    payload = json.loads(report.read_text())
+    assert payload["status"] == "partial"
+    assert "--resume" in payload["error"]
+    assert payload["added_misc_income"] == []
+
+    # A later sync works out afresh what is missing instead of carrying the
+    # abandoned records along, and leaves nothing pending behind
+    monkeypatch.setattr(runner, "add_misc_income", lambda incomes, *a, **k: incomes)
+    payload = json.loads(runner.run_misc_income(WORKBOOK, **common).read_text())
+    assert payload["status"] == "success"
+    assert not (tmp_path / "journal.jsonl").exists()
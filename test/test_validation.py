@@ -0,0 +1,63 @@
+import pytest
+
+from src.validation import to_cents, validate_deposits
+from test.conftest import income
+
+
+def test_to_cents_rounds_half_up():
+    assert to_cents(800) == 80000
+    assert to_cents(0.125) == 13
+    assert to_cents("1,200.50") == 120050
+    with pytest.raises(ValueError):
+        to_cents("abc")
+    with pytest.raises(ValueError, match="out of range"):
+        to_cents(1e30)
+
+
+def test_validate_deposits_normalises_valid_rows():
+    result = validate_deposits([income(7780.0, "800.005", " Rental ")], {"Rental"})
+
+    assert result.rejected == []
+    assert result.valid[0].record_id == "7780"
+    assert result.valid[0].amount == 800.01
+    assert result.valid[0].cents == 80001
+    assert result.valid[0].chart_of_account == "Rental"
+
+
+def test_validate_deposits_rejects_in_bulk_with_reasons():
+    rows = [
+        income("1", None),
+        income("2", "n/a"),
+        income("2b", "1e30"),
+        income("3", 10, "Typo"),
+        income("4", 10, ""),
+        income("", 10),
+        income("5", 10),
+        income("5", 20),
+        income("6", 30),
+    ]
+    result = validate_deposits(rows, {"Rental"})
+
+    assert [r.record_id for r in result.valid] == ["6"]
+    assert sorted((r.record_id, r.reason) for r in result.rejected) == [
+        ("", "missing_record_id"),
+        ("1", "missing_amount"),
+        ("2", "invalid_amount"),
+        ("2b", "invalid_amount"),
+        ("3", "unknown_chart_of_account"),
+        ("4", "missing_chart_of_account"),
+        ("5", "duplicate_record_id"),
+        ("5", "duplicate_record_id"),
+    ]
+
+
+def test_digest_and_comparer_use_the_validated_cents():
+    from src.comparer import compare_excel_qb
+    from src.fingerprints import income_digest
+
+    validated = validate_deposits([income("1", "0.125")]).valid
+    qb = [income("1", 0.13, source="quickbooks")]
+
+    assert validated[0].cents == 13
+    assert income_digest(validated) == income_digest([income("1", 0.125)])
+    assert compare_excel_qb(validated, qb).match_count == 1